@@ -1,52 +1,424 @@
+import argparse
+import hashlib
+import json
+import os
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
 import pandas as pd
 import numpy as np
+from pathlib import Path
 
-# Read the Excel file
-excel_file = 'data/Class Alternative GDP Index.xlsx'
-
-# Get all sheets from the Excel file
-xl = pd.ExcelFile(excel_file)
-sheets = xl.sheet_names
-
-# Initialize a dictionary to store all country scores
-country_scores = {}
-
-# Process each sheet
-for sheet in sheets:
-    df = pd.read_excel(excel_file, sheet_name=sheet)
-    
-    # Extract country and index score columns
-    # Assuming the structure is similar to the CSV with 'Country' and 'Index Score' columns
-    for idx, row in df.iterrows():
-        if pd.notna(row['Country']) and pd.notna(row['Index Score']):
-            country = row['Country']
-            score = float(row['Index Score'])
-            
-            if country not in country_scores:
-                country_scores[country] = []
-            country_scores[country].append(score)
-
-# Calculate average scores and create final dataframe
-final_data = []
-for country, scores in country_scores.items():
-    avg_score = np.mean(scores)
-    final_data.append({
-        'Country': country,
-        'Average Index Score': round(avg_score, 3),
-        'Number of Rankings': len(scores)
+DATA_DIR = Path(__file__).resolve().parent / 'data'
+EXCEL_FILE = DATA_DIR / 'Class Alternative GDP Index.xlsx'
+OUTPUT_FILE = DATA_DIR / 'average_rankings.csv'
+STATS_FILE = DATA_DIR / 'ranking_statistics.csv'
+CACHE_DIR = DATA_DIR / '.cache'
+CACHE_VERSION = 1
+STATE_VERSION = 1
+
+XLSX_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+XLSX_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+XLSX_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+def file_digest(path):
+    """sha256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sheet_scores(df):
+    """The Country / Index Score rows of one parsed sheet that have both values."""
+    # Empty sheets have no header row to select from
+    if df.empty:
+        return pd.DataFrame({'Country': pd.Series(dtype=object), 'Index Score': pd.Series(dtype=float)})
+    scores = df[['Country', 'Index Score']].dropna()
+    return scores.astype({'Index Score': float})
+
+
+def read_workbook(excel_file):
+    """Read every sheet of the workbook in one parse and stack their Sheet / Country / Index Score rows."""
+    sheets = pd.read_excel(excel_file, sheet_name=None)
+    scores = pd.concat([sheet_scores(df).assign(Sheet=name) for name, df in sheets.items()],
+                       ignore_index=True)
+    return scores[['Sheet', 'Country', 'Index Score']]
+
+
+def cache_path(excel_file):
+    """Sidecar file holding the parsed sheets of excel_file."""
+    return CACHE_DIR / f"{Path(excel_file).name}.npz"
+
+
+def workbook_key(excel_file, digest=None):
+    """What the cache is keyed on: the workbook's path, size, mtime and (optionally) hash."""
+    stat = os.stat(excel_file)
+    return {
+        'version': CACHE_VERSION,
+        'path': str(Path(excel_file).resolve()),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': digest,
+    }
+
+
+def load_cached_scores(excel_file, cache_file):
+    """Parsed scores from cache_file, or None if it's missing or the workbook has changed."""
+    try:
+        with np.load(cache_file, allow_pickle=False) as data:
+            key = json.loads(str(data['key']))
+            columns = {name: data[name] for name in ('sheet', 'country', 'score')}
+    except (OSError, ValueError, KeyError):
+        return None
+
+    current = workbook_key(excel_file)
+    if key.get('version') != CACHE_VERSION or key.get('path') != current['path']:
+        return None
+    stale = key.get('size') != current['size'] or key.get('mtime_ns') != current['mtime_ns']
+    if stale:
+        # Touched but maybe not edited (e.g. re-saved or checked out again): only the hash decides
+        if key.get('size') != current['size'] or key.get('sha256') != file_digest(excel_file):
+            return None
+
+    scores = pd.DataFrame({
+        'Sheet': columns['sheet'].tolist(),
+        'Country': columns['country'].tolist(),
+        'Index Score': columns['score'],
+    })
+    if stale:
+        save_cached_scores(excel_file, cache_file, scores, key['sha256'])
+    return scores
+
+
+def save_cached_scores(excel_file, cache_file, scores, digest=None):
+    """Write the parsed scores to cache_file as compressed columns."""
+    key = workbook_key(excel_file, digest or file_digest(excel_file))
+    cache_file = Path(cache_file)
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_name(cache_file.name + '.tmp')
+    with open(tmp_file, 'wb') as f:
+        np.savez_compressed(
+            f,
+            key=np.array(json.dumps(key)),
+            sheet=scores['Sheet'].to_numpy(dtype=str),
+            country=scores['Country'].to_numpy(dtype=str),
+            score=scores['Index Score'].to_numpy(dtype=float),
+        )
+    os.replace(tmp_file, cache_file)
+
+
+def clear_cache(excel_file=EXCEL_FILE):
+    """Delete the parsed-workbook cache and incremental totals for excel_file, if there are any."""
+    cleared = False
+    for path in (cache_path(excel_file), state_path(excel_file)):
+        try:
+            path.unlink()
+            cleared = True
+        except FileNotFoundError:
+            pass
+    return cleared
+
+
+def load_scores(excel_file=EXCEL_FILE, use_cache=True):
+    """Stacked Sheet / Country / Index Score rows of every sheet in the workbook.
+
+    With use_cache the parsed sheets are kept in a sidecar under data/.cache and
+    the workbook is only parsed again once it has actually changed.
+    """
+    cache_file = cache_path(excel_file)
+    if use_cache:
+        scores = load_cached_scores(excel_file, cache_file)
+        if scores is not None:
+            return scores
+
+    scores = read_workbook(excel_file)
+    if use_cache:
+        save_cached_scores(excel_file, cache_file, scores)
+    return scores
+
+
+def average_rankings(scores):
+    """Average each country's score across all rankings and rank them, highest first."""
+    # sort=False keeps countries in order of first appearance, so ties rank the same as before
+    grouped = scores.groupby('Country', sort=False)['Index Score']
+    # np.mean per country (one call per country, not per row) matches the old
+    # averages to the last bit; groupby's own mean sums in a different order and
+    # can flip the third decimal after rounding
+    averages = grouped.agg(lambda group: np.mean(group.to_numpy()))
+
+    return rank_averages(averages.index, averages.to_numpy(), grouped.size().to_numpy())
+
+
+def rank_averages(countries, averages, counts):
+    """Round the averages, sort them highest first and number the ranks."""
+    final_df = pd.DataFrame({
+        'Country': countries,
+        'Average Index Score': np.round(np.asarray(averages, dtype=float), 3),
+        'Number of Rankings': np.asarray(counts, dtype=int)
+    })
+
+    # Sort by average score
+    final_df = final_df.sort_values('Average Index Score', ascending=False)
+    final_df['Rank'] = range(1, len(final_df) + 1)
+
+    # Reorder columns
+    return final_df[['Rank', 'Country', 'Average Index Score', 'Number of Rankings']]
+
+
+def workbook_sheets(excel_file):
+    """Sheet name -> sha256 of its worksheet XML, plus the shared string table, in workbook order.
+
+    Read straight from the xlsx zip, so nothing is parsed into cells.
+    """
+    with zipfile.ZipFile(excel_file) as xlsx:
+        rels = ET.fromstring(xlsx.read('xl/_rels/workbook.xml.rels'))
+        targets = {rel.get('Id'): rel.get('Target') for rel in rels.iter(XLSX_PKG_REL + 'Relationship')}
+        workbook = ET.fromstring(xlsx.read('xl/workbook.xml'))
+        hashes = {}
+        for sheet in workbook.iter(XLSX_MAIN + 'sheet'):
+            target = targets[sheet.get(XLSX_REL + 'id')]
+            part = target.lstrip('/') if target.startswith('/') else posixpath.normpath(posixpath.join('xl', target))
+            hashes[sheet.get('name')] = hashlib.sha256(xlsx.read(part)).hexdigest()
+        try:
+            shared = ET.fromstring(xlsx.read('xl/sharedStrings.xml'))
+        except KeyError:
+            shared = None
+    strings = [] if shared is None else [''.join(t.text or '' for t in si.iter(XLSX_MAIN + 't'))
+                                         for si in shared.iter(XLSX_MAIN + 'si')]
+    return hashes, strings
+
+
+def strings_digest(strings):
+    return hashlib.sha256('\0'.join(strings).encode()).hexdigest()
+
+
+def state_path(excel_file):
+    """Running totals kept by --incremental for excel_file."""
+    return CACHE_DIR / f"{Path(excel_file).name}.rankings.json"
+
+
+def new_state():
+    return {
+        'version': STATE_VERSION,
+        'strings': {'count': 0, 'sha256': strings_digest([])},
+        'sheets': {},  # Sheet name -> {'sha256': ..., 'scores': [[country, score], ...]}
+        'totals': {},  # Country -> [sum of scores, number of scores]
+    }
+
+
+def load_state(state_file):
+    try:
+        with open(state_file) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return new_state()
+    return state if state.get('version') == STATE_VERSION else new_state()
+
+
+def save_state(state_file, state):
+    state_file = Path(state_file)
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = state_file.with_name(state_file.name + '.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_file, state_file)
+
+
+def fold_sheet(totals, scores):
+    for country, score in scores:
+        total = totals.setdefault(country, [0.0, 0])
+        total[0] += score
+        total[1] += 1
+
+
+def update_rankings(excel_file=EXCEL_FILE, state_file=None):
+    """Fold new or changed sheets into the saved per-country running sums and counts.
+
+    Each sheet is remembered by the hash of its XML, so a rerun only parses the
+    sheets groups have added or edited since. Returns (state, names of the
+    sheets that were read).
+    """
+    state_file = state_file or state_path(excel_file)
+    hashes, strings = workbook_sheets(excel_file)
+    state = load_state(state_file)
+
+    # Sheets point into the shared string table by index. Appending strings
+    # (a new group's countries) is fine; anything else means unchanged sheet XML
+    # may now read differently, so start over.
+    known = state['strings']['count']
+    if len(strings) < known or strings_digest(strings[:known]) != state['strings']['sha256']:
+        state = new_state()
+
+    changed = [name for name, digest in hashes.items()
+               if state['sheets'].get(name, {}).get('sha256') != digest]
+    # Edited or deleted sheets have to be taken back out of the totals
+    rebuild = any(name in state['sheets'] for name in changed) or any(name not in hashes for name in state['sheets'])
+
+    if changed:
+        parsed = pd.read_excel(excel_file, sheet_name=changed)
+        for name in changed:
+            scores = sheet_scores(parsed[name])
+            state['sheets'][name] = {
+                'sha256': hashes[name],
+                'scores': list(zip(scores['Country'].tolist(), scores['Index Score'].tolist())),
+            }
+    state['sheets'] = {name: state['sheets'][name] for name in hashes}
+
+    if rebuild:
+        state['totals'] = {}
+        for sheet in state['sheets'].values():
+            fold_sheet(state['totals'], sheet['scores'])
+    else:
+        for name in changed:
+            fold_sheet(state['totals'], state['sheets'][name]['scores'])
+
+    state['strings'] = {'count': len(strings), 'sha256': strings_digest(strings)}
+    save_state(state_file, state)
+    return state, changed
+
+
+def rankings_from_totals(totals):
+    """Rank countries by sum / count of their running totals."""
+    countries = list(totals)
+    sums = np.array([totals[country][0] for country in countries], dtype=float)
+    counts = np.array([totals[country][1] for country in countries], dtype=int)
+    return rank_averages(countries, sums / counts, counts)
+
+
+def score_matrix(scores):
+    """Countries (in order of first appearance), their scores padded with NaN into one row each, and counts."""
+    codes, countries = pd.factorize(scores['Country'])
+    counts = np.bincount(codes, minlength=len(countries))
+    order = np.argsort(codes, kind='stable')
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    # Position of each score within its country's row
+    columns = np.arange(len(codes)) - np.repeat(starts, counts)
+    matrix = np.full((len(countries), counts.max(initial=0)), np.nan)
+    matrix[codes[order], columns] = scores['Index Score'].to_numpy(dtype=float)[order]
+    return list(countries), matrix, counts
+
+
+def trimmed_means(matrix, counts, trim):
+    """Mean of each row after dropping floor(trim * n) scores from both ends."""
+    ordered = np.sort(matrix, axis=1)  # NaN padding sorts last
+    cut = np.floor(trim * counts).astype(int)
+    columns = np.arange(matrix.shape[1])
+    keep = (columns >= cut[:, None]) & (columns < (counts - cut)[:, None])
+    return np.where(keep, ordered, 0.0).sum(axis=1) / keep.sum(axis=1)
+
+
+def borda_scores(scores):
+    """Average normalized Borda points per country.
+
+    Each sheet is one group's ballot: a country ranked r of m gets (m - r) / (m - 1)
+    points, so 1 for that group's top country and 0 for its last. Points are
+    averaged over the sheets a country appears in, since groups rank different
+    numbers of countries.
+    """
+    by_sheet = scores.groupby('Sheet', sort=False)['Index Score']
+    place = by_sheet.rank(ascending=False, method='average')
+    size = by_sheet.transform('size')
+    points = ((size - place) / (size - 1).where(size > 1)).fillna(1.0)
+    return points.groupby(scores['Country'], sort=False).mean()
+
+
+def bootstrap(matrix, counts, resamples, rng, block=1000):
+    """Bootstrap means and ranks (1 = highest mean) of every country.
+
+    Each resample draws n scores with replacement from a country's own n scores.
+    Resamples are drawn for all countries at once, block rows at a time to keep
+    memory bounded. Returns two (resamples, countries) arrays.
+    """
+    n_countries, width = matrix.shape
+    rows = np.arange(n_countries)[None, :, None]
+    used = np.arange(width)[None, None, :] < counts[None, :, None]
+    means = np.empty((resamples, n_countries))
+    ranks = np.empty((resamples, n_countries), dtype=np.int32)
+    for start in range(0, resamples, block):
+        size = min(block, resamples - start)
+        picks = rng.integers(0, counts[None, :, None], size=(size, n_countries, width))
+        drawn = np.where(used, matrix[rows, picks], 0.0)
+        block_means = drawn.sum(axis=2) / counts
+        order = np.argsort(-block_means, axis=1, kind='stable')
+        block_ranks = np.empty_like(order, dtype=np.int32)
+        np.put_along_axis(block_ranks, order, np.arange(1, n_countries + 1, dtype=np.int32)[None, :], axis=1)
+        means[start:start + size] = block_means
+        ranks[start:start + size] = block_ranks
+    return means, ranks
+
+
+def ranking_statistics(scores, resamples=10000, confidence=0.95, trim=0.25, seed=0):
+    """Robust per-country statistics to go alongside average_rankings.
+
+    Median, trimmed mean, Borda rank, and bootstrap confidence intervals for
+    each country's mean score and for its rank by mean score. seed makes the
+    intervals reproducible between runs.
+    """
+    countries, matrix, counts = score_matrix(scores)
+    means, ranks = bootstrap(matrix, counts, resamples, np.random.default_rng(seed))
+    tails = [50 * (1 - confidence), 50 * (1 + confidence)]
+    score_low, score_high = np.percentile(means, tails, axis=0)
+    rank_low, rank_high = np.percentile(ranks, tails, axis=0)
+    borda = borda_scores(scores).reindex(countries).to_numpy()
+
+    stats = pd.DataFrame({
+        'Country': countries,
+        'Median Index Score': np.round(np.nanmedian(matrix, axis=1), 3),
+        'Trimmed Mean Index Score': np.round(trimmed_means(matrix, counts, trim), 3),
+        'Score CI Low': np.round(score_low, 3),
+        'Score CI High': np.round(score_high, 3),
+        'Rank CI Low': np.floor(rank_low).astype(int),
+        'Rank CI High': np.ceil(rank_high).astype(int),
+        'Borda Score': np.round(borda, 3),
     })
+    stats['Borda Rank'] = stats['Borda Score'].rank(ascending=False, method='min').astype(int)
+
+    final_df = average_rankings(scores).merge(stats, on='Country')
+    return final_df[['Rank', 'Country', 'Average Index Score', 'Number of Rankings',
+                     'Median Index Score', 'Trimmed Mean Index Score', 'Score CI Low', 'Score CI High',
+                     'Rank CI Low', 'Rank CI High', 'Borda Score', 'Borda Rank']]
+
+
+def process_rankings(excel_file=EXCEL_FILE, output_file=OUTPUT_FILE, use_cache=True, incremental=False):
+    """Compute the average rankings for the workbook and save them to output_file.
+
+    incremental keeps running totals between runs and only reads new or changed
+    sheets (see update_rankings); averages are then sum / count, which can round
+    the third decimal differently from a full run on exact ties.
+    """
+    if incremental:
+        state, changed = update_rankings(excel_file)
+        print(f"Read {len(changed)} new or changed sheet(s), {len(state['sheets']) - len(changed)} unchanged")
+        final_df = rankings_from_totals(state['totals'])
+    else:
+        final_df = average_rankings(load_scores(excel_file, use_cache=use_cache))
+    final_df.to_csv(output_file, index=False)
+    return final_df
+
 
-# Create DataFrame and sort by average score
-final_df = pd.DataFrame(final_data)
-final_df = final_df.sort_values('Average Index Score', ascending=False)
-final_df['Rank'] = range(1, len(final_df) + 1)
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Average each country's Index Score across the class rankings.")
+    parser.add_argument('--no-cache', action='store_true', help="parse the workbook even if a cached copy is current")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="delete the parsed-workbook cache and incremental totals first")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only read sheets added or changed since the last --incremental run")
+    parser.add_argument('--stats', action='store_true',
+                        help=f"also write median, trimmed mean, Borda rank and bootstrap intervals to {STATS_FILE.name}")
+    parser.add_argument('--resamples', type=int, default=10000, help="bootstrap resamples for --stats (default: 10000)")
+    args = parser.parse_args()
 
-# Reorder columns
-final_df = final_df[['Rank', 'Country', 'Average Index Score', 'Number of Rankings']]
+    if args.clear_cache and clear_cache():
+        print(f"Cleared cache {cache_path(EXCEL_FILE)}")
+    final_df = process_rankings(use_cache=not args.no_cache, incremental=args.incremental)
+    print(f"\nResults saved to {OUTPUT_FILE}")
+    print("\nTop 10 Countries by Average Index Score:")
+    print(final_df.head(10).to_string(index=False))
 
-# Save to CSV
-output_file = 'data/average_rankings.csv'
-final_df.to_csv(output_file, index=False)
-print(f"\nResults saved to {output_file}")
-print("\nTop 10 Countries by Average Index Score:")
-print(final_df.head(10).to_string(index=False))
+    if args.stats:
+        stats_df = ranking_statistics(load_scores(use_cache=not args.no_cache), resamples=args.resamples)
+        stats_df.to_csv(STATS_FILE, index=False)
+        print(f"\nRanking statistics saved to {STATS_FILE}")
@@ -0,0 +1,128 @@
+"""Benchmark CanvasIntegrator.sync_materials against the local FakeCanvas stand-in.
+
+Generates course trees with the given numbers of PDFs, then syncs each one
+cold (empty course), warm (everything already in Canvas, no manifest) and
+warm with a manifest. For every run it reports the request count, wall-clock
+time and peak Python memory.
+
+    python benchmark_canvas_sync.py --sizes 20 200 2000 --latency 0.005 --jobs 4 --json bench.json
+
+--url-upload serves the generated tree over local HTTP and syncs with
+upload_source pointed at it, exercising Canvas's URL upload flow.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List
+
+from canvas_integration import CanvasIntegrator, CanvasTransport, RateLimitGovernor, SyncManifest
+from fake_canvas import FakeCanvas, serve_site
+
+
+def generate_tree(root: Path, count: int, file_size: int) -> None:
+    """Create lecture slides, notes and review PDFs totalling count files under root."""
+    reviews = min(10, max(1, count // 20))
+    lectures = (count - reviews + 1) // 2
+    for folder in ("lecture_slides", "lecture_notes", "review_session"):
+        (root / folder).mkdir(parents=True, exist_ok=True)
+
+    def write(path: Path) -> None:
+        path.write_bytes(b'%PDF-1.4\n' + os.urandom(max(0, file_size - 9)))
+
+    written = 0
+    for lecture in range(1, lectures + 1):
+        if written < count - reviews:
+            write(root / "lecture_slides" / f"Lecture{lecture}_updated.pdf")
+            written += 1
+        if written < count - reviews:
+            write(root / "lecture_notes" / f"Econ 2 Lecture {lecture} S25.pdf")
+            written += 1
+    for week in range(1, reviews + 1):
+        # Week 5 is never synced, so shift past it to keep the file count honest
+        write(root / "review_session" / f"Week{week if week < 5 else week + 1}ReviewSession.pdf")
+
+
+def run_sync(fake: FakeCanvas, jobs: int, manifest: SyncManifest = None,
+             upload_source: str = None) -> Dict[str, Any]:
+    """Run one sync_materials pass and measure it."""
+    transport = CanvasTransport(session=fake.session(), pool_size=max(10, jobs),
+                                governor=RateLimitGovernor(max_concurrency=max(10, jobs)))
+    canvas = CanvasIntegrator("token", "1", base_url=fake.base_url, transport=transport, manifest=manifest)
+    canvas.upload_source = upload_source
+    canvas.progress_poll_interval = 0.05
+    fake.reset_counters()
+    tracemalloc.start()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        canvas.sync_materials(jobs=jobs)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    transport.close()
+    return {
+        'requests': len(fake.requests),
+        'throttled': fake.throttled,
+        'seconds': round(elapsed, 3),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def benchmark(size: int, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Benchmark cold and warm syncs of a generated tree with size PDFs."""
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate_tree(root, size, args.file_size)
+        fake = FakeCanvas(latency=args.latency, rate_limit=args.rate_limit, refill_rate=args.refill_rate)
+        manifest = SyncManifest(root / "manifest.json", "1")
+        site, upload_source = serve_site(root) if args.url_upload else (None, None)
+        os.chdir(root)
+        try:
+            for label, run_manifest in (("cold", manifest), ("warm", None), ("warm+manifest", manifest)):
+                result = run_sync(fake, args.jobs, run_manifest, upload_source)
+                result.update({'files': size, 'run': label, 'jobs': args.jobs})
+                results.append(result)
+                print(f"{size:>6} {label:<14} {result['requests']:>8} {result['seconds']:>9.3f} "
+                      f"{result['peak_memory_kb']:>12.1f} {result['throttled']:>9}")
+        finally:
+            os.chdir(cwd)
+            if site is not None:
+                site.shutdown()
+                site.server_close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sync_materials against a local fake Canvas.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 200, 2000],
+                        help="numbers of PDFs to generate (default: 20 200 2000)")
+    parser.add_argument('--file-size', type=int, default=16 * 1024, help="bytes per generated PDF")
+    parser.add_argument('--jobs', type=int, default=1, help="concurrent uploads passed to sync_materials")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds of latency added per request")
+    parser.add_argument('--rate-limit', type=float, default=None, help="rate-limit bucket size (default: off)")
+    parser.add_argument('--refill-rate', type=float, default=10.0, help="rate-limit refill per second")
+    parser.add_argument('--url-upload', action='store_true',
+                        help="have the fake Canvas fetch files from a local stand-in for the published site")
+    parser.add_argument('--json', default=None, help="write results to this JSON file")
+    args = parser.parse_args()
+
+    print(f"{'files':>6} {'run':<14} {'requests':>8} {'seconds':>9} {'peak_mem_kb':>12} {'throttled':>9}")
+    results = []
+    for size in args.sizes:
+        results.extend(benchmark(size, args))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Convert the course_materials workbooks into compact JSON assets for the data pages.
+
+real-time-data.html and industry-data-analyzer.html used to download each .xlsx
+and parse it in the browser with SheetJS on every page load. This does that
+parsing once: every sheet is stored column by column (header names once, no
+empty cells, dates as Excel serial numbers), so a page rebuilds exactly the
+rows XLSX.utils.sheet_to_json(sheet, { raw: true }) used to give it.
+
+Each asset records the sha256 of the workbook it came from, and is only rebuilt
+when that workbook's content changes.
+
+    python build_data_assets.py          # rebuild assets whose workbook changed
+    python build_data_assets.py --force  # rebuild everything
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+SOURCE_DIR = Path("course_materials")
+OUTPUT_DIR = SOURCE_DIR / "data"
+FORMAT_VERSION = 1
+
+# Workbooks the pages chart
+WORKBOOKS = ["cpi.xlsx", "GDP.xlsx", "valueaddedindustryGDP.xlsx", "IndustryOutput.xlsx"]
+
+EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+
+def file_hash(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def asset_path(workbook):
+    return OUTPUT_DIR / f"{Path(workbook).stem}.json"
+
+def cell_value(value):
+    """A cell as SheetJS reports it with raw: true (dates become Excel serial numbers)."""
+    if isinstance(value, datetime.datetime):
+        serial = (value - EXCEL_EPOCH) / datetime.timedelta(days=1)
+        return int(serial) if serial.is_integer() else serial
+    if isinstance(value, datetime.date):
+        return (value - EXCEL_EPOCH.date()).days
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def header_names(row):
+    """Column names like sheet_to_json: blanks become __EMPTY, repeats get _1, _2, ..."""
+    names, seen = [], {}
+    for value in row:
+        name = "__EMPTY" if value is None or str(value) == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}_{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+def sheet_ref(worksheet):
+    """The sheet's used range ("A1:G314"), which SheetJS exposes as worksheet['!ref']."""
+    try:
+        return worksheet.calculate_dimension()
+    except ValueError:
+        # Read-only sheets saved without a <dimension> element have to be measured
+        worksheet.reset_dimensions()
+        return worksheet.calculate_dimension(force=True)
+
+def convert_sheet(worksheet):
+    """{"ref", "rows", "columns", "values": [[column 0], ...]} for one sheet.
+
+    Blank rows and columns with no values at all are left out, as sheet_to_json
+    never reports them; other empty cells are stored as null.
+    """
+    ref = sheet_ref(worksheet)
+    rows = worksheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return {"ref": ref, "rows": 0, "columns": [], "values": []}
+    names = header_names(header)
+    body = [[cell_value(value) for value in row] for row in rows
+            if any(value is not None and value != "" for value in row)]
+
+    columns, values = [], []
+    for index, name in enumerate(names):
+        column = [row[index] if index < len(row) else None for row in body]
+        if any(value is not None for value in column):
+            columns.append(name)
+            values.append(column)
+    return {"ref": ref, "rows": len(body), "columns": columns, "values": values}
+
+def build_asset(workbook, force=False):
+    """Convert one workbook unless its asset is already up to date. Returns True if it was rebuilt."""
+    source = SOURCE_DIR / workbook
+    target = asset_path(workbook)
+    source_hash = file_hash(source)
+    if not force and target.exists():
+        try:
+            with open(target) as f:
+                existing = json.load(f)
+            if existing.get("version") == FORMAT_VERSION and existing.get("source_sha256") == source_hash:
+                return False
+        except ValueError:
+            pass
+
+    book = load_workbook(source, read_only=True, data_only=True)
+    try:
+        asset = {
+            "version": FORMAT_VERSION,
+            "source": workbook,
+            "source_sha256": source_hash,
+            "sheetNames": book.sheetnames,
+            "sheets": {name: convert_sheet(book[name]) for name in book.sheetnames},
+        }
+    finally:
+        book.close()
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(target.name + ".tmp")
+    with open(tmp_path, 'w') as f:
+        # Minified; GitHub Pages compresses it on the way out
+        json.dump(asset, f, separators=(',', ':'), ensure_ascii=False, allow_nan=False)
+    os.replace(tmp_path, target)
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert course_materials workbooks into JSON assets for the data pages.")
+    parser.add_argument('--force', action='store_true', help="rebuild every asset even if its workbook is unchanged")
+    args = parser.parse_args()
+
+    for workbook in WORKBOOKS:
+        if build_asset(workbook, force=args.force):
+            print(f"Built {asset_path(workbook)} ({os.path.getsize(asset_path(workbook))} bytes) from {workbook}")
+        else:
+            print(f"{asset_path(workbook)} is up to date")
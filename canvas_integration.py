@@ -1,70 +1,1254 @@
+import argparse
+import hashlib
+import io
+import json
+import logging
+import mimetypes
 import os
+import random
 import requests
+import threading
 import time
-from typing import Optional, Dict, List, Any
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from requests.adapters import HTTPAdapter
+from typing import Callable, Optional, Dict, List, Any, Tuple, Union
 from pathlib import Path
+from urllib.parse import parse_qs, quote, urlencode, urlsplit, urlunsplit
+
+# Local state (sync manifest etc.) kept between runs, relative to the repo root
+SYNC_STATE_DIR = ".canvas_sync"
+
+logger = logging.getLogger("canvas_integration")
+
+def endpoint_template(url: str) -> str:
+    """Collapse ids and paths in a request URL so calls to the same endpoint group together."""
+    parts = urlsplit(url)
+    segments = parts.path.split('/')
+    if 'by_path' in segments:
+        segments = segments[:segments.index('by_path') + 1] + [':path']
+    template = '/'.join(':id' if segment.isdigit() else segment for segment in segments)
+    return template if template.startswith('/api/') else f"{parts.netloc}{template}"
+
+@dataclass
+class RequestRecord:
+    """Timing and size of one HTTP request made during a sync."""
+    method: str
+    endpoint: str
+    status: int
+    latency: float
+    bytes_sent: int
+    bytes_received: int
+    page: int
+    phase: Optional[str]
+
+class SyncProfiler:
+    """Collects per-request records and per-phase timings for a sync run."""
+
+    def __init__(self):
+        self.records = []
+        self.phases = {}  # Phase name -> seconds
+        self.materials = {}  # Material kind -> {'files', 'seconds'} spent executing its uploads and items
+        self._phase = None
+        self._phase_started = None
+        self._lock = threading.Lock()
+
+    def mark_phase(self, name: Optional[str]) -> None:
+        """End the current phase and start a new one (None just ends it)."""
+        now = time.perf_counter()
+        if self._phase is not None:
+            self.phases[self._phase] = self.phases.get(self._phase, 0.0) + now - self._phase_started
+        self._phase = name
+        self._phase_started = now
+
+    def record_material(self, kind: str, seconds: float, new_file: bool = True) -> None:
+        """Add time spent syncing a file of a material kind (summed across upload workers).
+
+        A file's upload and its module item are recorded separately; only the
+        first passes new_file so each file is counted once.
+        """
+        with self._lock:
+            stats = self.materials.setdefault(kind, {'files': 0, 'seconds': 0.0})
+            stats['files'] += int(new_file)
+            stats['seconds'] += seconds
+
+    def record(self, method: str, response: requests.Response, latency: float) -> None:
+        """Record one response and how long it took."""
+        request = response.request
+        sent = request.headers.get('Content-Length') if request is not None else None
+        if sent is None and request is not None and isinstance(request.body, (bytes, str)):
+            sent = len(request.body)
+        received = response.headers.get('Content-Length')
+        if received is None:
+            received = len(response.content)
+        page = parse_qs(urlsplit(response.url or '').query).get('page', ['1'])[0]
+        record = RequestRecord(
+            method=method.upper(),
+            endpoint=endpoint_template(response.url or ''),
+            status=response.status_code,
+            latency=latency,
+            bytes_sent=int(sent or 0),
+            bytes_received=int(received),
+            page=int(page) if page.isdigit() else 1,
+            phase=self._phase,
+        )
+        with self._lock:
+            self.records.append(record)
+
+    def summary(self, top_n: int = 10) -> Dict[str, Any]:
+        """Aggregate the records by endpoint and list the slowest calls."""
+        endpoints = {}
+        for record in self.records:
+            stats = endpoints.setdefault(f"{record.method} {record.endpoint}", {
+                'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+                'bytes_sent': 0, 'bytes_received': 0, 'max_page': 0, 'statuses': {},
+            })
+            stats['calls'] += 1
+            stats['total_seconds'] += record.latency
+            stats['max_seconds'] = max(stats['max_seconds'], record.latency)
+            stats['bytes_sent'] += record.bytes_sent
+            stats['bytes_received'] += record.bytes_received
+            stats['max_page'] = max(stats['max_page'], record.page)
+            status = str(record.status)
+            stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+        for stats in endpoints.values():
+            stats['mean_seconds'] = stats['total_seconds'] / stats['calls']
+
+        slowest = sorted(self.records, key=lambda record: record.latency, reverse=True)[:top_n]
+        return {
+            'requests': len(self.records),
+            'request_seconds': sum(record.latency for record in self.records),
+            'bytes_sent': sum(record.bytes_sent for record in self.records),
+            'bytes_received': sum(record.bytes_received for record in self.records),
+            'phases': self.phases,
+            'materials': self.materials,
+            'endpoints': endpoints,
+            'slowest': [asdict(record) for record in slowest],
+        }
+
+    def write(self, path: Union[str, Path], top_n: int = 10) -> None:
+        """Write the JSON summary to path."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.summary(top_n), f, indent=2)
+
+    def report(self, top_n: int = 10) -> str:
+        """Human-readable phase timings and top-N slowest calls table."""
+        summary = self.summary(top_n)
+        lines = [f"{summary['requests']} requests, {summary['request_seconds']:.2f}s in requests, "
+                 f"{summary['bytes_sent']} bytes sent, {summary['bytes_received']} bytes received"]
+        for name, seconds in summary['phases'].items():
+            lines.append(f"  {name:<12} {seconds:8.2f}s")
+        if summary['materials']:
+            lines.append("Execute time by material (summed across workers):")
+            for kind, stats in summary['materials'].items():
+                lines.append(f"  {kind:<12} {stats['seconds']:8.2f}s  {stats['files']} files")
+        lines.append(f"Top {len(summary['slowest'])} slowest calls:")
+        lines.append(f"  {'seconds':>8}  {'status':>6}  {'page':>4}  {'phase':<12} endpoint")
+        for record in summary['slowest']:
+            lines.append(f"  {record['latency']:8.3f}  {record['status']:>6}  {record['page']:>4}  "
+                         f"{record['phase'] or '-':<12} {record['method']} {record['endpoint']}")
+        return '\n'.join(lines)
+
+class RateLimitGovernor:
+    """Paces Canvas requests using the quota Canvas reports in response headers.
+
+    Canvas keeps a leaky bucket per token and reports what is left in
+    X-Rate-Limit-Remaining. The bucket's size is taken to be the most ever seen
+    (remaining plus the request's cost), and the watermarks are fractions of it.
+    As the estimated quota drains below the high watermark the number of
+    requests allowed in flight shrinks towards one; below the low watermark a
+    request only waits if the bucket can't cover its cost yet. The refill rate
+    is estimated from successive samples, starting from refill_rate. Throttled
+    (403/429) and 5xx responses are retried with jittered exponential backoff.
+    """
+
+    RETRY_METHODS = {'GET', 'HEAD', 'PUT', 'DELETE'}  # 5xx is only retried for idempotent calls
+    DEFAULT_CAPACITY = 700.0  # Canvas's bucket size, until responses show otherwise
+    MIN_SAMPLE_SECONDS = 0.25  # Shorter gaps are too noisy to estimate the refill rate from
+
+    def __init__(self, max_concurrency: int = 8, high_watermark: float = 0.4,
+                 low_watermark: float = 0.1, refill_rate: float = 10.0,
+                 max_retries: int = 5, backoff_base: float = 0.5, backoff_cap: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.high_fraction = high_watermark  # Fractions of the bucket size
+        self.low_fraction = low_watermark
+        self.refill_rate = refill_rate
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.capacity = None  # Largest remaining + cost seen
+        self.remaining = None  # Last reported quota, None until Canvas tells us
+        self.last_cost = None
+        self.updated_at = time.monotonic()
+        self._sample = None  # (remaining, monotonic time) the refill rate is next measured from
+        self._spent = 0.0  # Cost charged since that sample
+        self.in_flight = 0
+        self.throttled = 0
+        self._condition = threading.Condition()
+
+    @property
+    def high_watermark(self) -> float:
+        return self.high_fraction * (self.capacity or self.DEFAULT_CAPACITY)
+
+    @property
+    def low_watermark(self) -> float:
+        return self.low_fraction * (self.capacity or self.DEFAULT_CAPACITY)
+
+    def estimated_remaining(self) -> Optional[float]:
+        """Reported quota plus what the bucket has refilled since."""
+        if self.remaining is None:
+            return None
+        estimate = self.remaining + self.refill_rate * (time.monotonic() - self.updated_at)
+        return min(estimate, self.capacity) if self.capacity else estimate
+
+    def allowed_concurrency(self) -> int:
+        """How many requests may be in flight given the current quota."""
+        remaining = self.estimated_remaining()
+        if remaining is None or remaining >= self.high_watermark:
+            return self.max_concurrency
+        share = max(remaining - self.low_watermark, 0) / (self.high_watermark - self.low_watermark)
+        # Never more in flight than the bucket can pay for
+        affordable = int(remaining / (self.last_cost or 1.0))
+        return max(1, min(int(self.max_concurrency * share), affordable))
+
+    @contextmanager
+    def slot(self):
+        """Hold one in-flight request slot, pacing first if the quota is low."""
+        with self._condition:
+            while self.in_flight >= self.allowed_concurrency():
+                self._condition.wait(timeout=0.5)
+            self.in_flight += 1
+            remaining = self.estimated_remaining()
+            delay = 0.0
+            if remaining is not None and remaining < self.low_watermark:
+                # Wait just until the bucket holds enough for this request
+                delay = max(0.0, (self.last_cost or 1.0) - remaining) / self.refill_rate
+        if delay:
+            time.sleep(delay)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def observe(self, response: requests.Response) -> None:
+        """Update the quota, bucket size and refill rate from a response's rate-limit headers."""
+        remaining = response.headers.get('X-Rate-Limit-Remaining')
+        if remaining is None:
+            return
+        with self._condition:
+            try:
+                remaining = float(remaining)
+                cost = float(response.headers.get('X-Request-Cost', 0))
+            except ValueError:
+                return
+            now = time.monotonic()
+            if self.is_throttled(response):
+                cost = 0.0  # Rejected requests aren't charged
+            self.capacity = max(self.capacity or 0.0, remaining + cost)
+            self._spent += cost
+            if self._sample is None:
+                self._sample = (remaining, now)
+                self._spent = 0.0
+            elif now - self._sample[1] >= self.MIN_SAMPLE_SECONDS:
+                # A full bucket stops refilling, so samples near the top would read low
+                if remaining < 0.9 * self.capacity:
+                    measured = (remaining - self._sample[0] + self._spent) / (now - self._sample[1])
+                    if measured > 0:
+                        self.refill_rate = 0.5 * self.refill_rate + 0.5 * measured
+                self._sample = (remaining, now)
+                self._spent = 0.0
+            self.remaining = remaining
+            self.last_cost = cost or self.last_cost
+            self.updated_at = now
+            self._condition.notify_all()
+
+    @staticmethod
+    def is_throttled(response: requests.Response) -> bool:
+        if response.status_code == 429:
+            return True
+        return response.status_code == 403 and 'rate limit exceeded' in response.text.lower()
+
+    def retry_delay(self, method: str, response: requests.Response, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the response should be returned."""
+        throttled = self.is_throttled(response)
+        if not throttled and not (response.status_code >= 500 and method.upper() in self.RETRY_METHODS):
+            return None
+        if attempt >= self.max_retries:
+            return None
+        if throttled:
+            with self._condition:
+                self.throttled += 1
+                self.remaining = 0.0
+                self.updated_at = time.monotonic()
+        retry_after = response.headers.get('Retry-After')
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        # Full jitter keeps parallel workers from retrying in lockstep
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+class ResponseCache:
+    """Persistent cache of Canvas GET responses, revalidated with ETag / Last-Modified.
+
+    Entries are keyed by full URL (query included) and kept in least-recently-used
+    order, bounded by entry count and total body size. Within an endpoint's TTL
+    a cached body is served without any request; after that it is revalidated
+    with If-None-Match / If-Modified-Since, so an unchanged listing costs a 304
+    instead of a full download. Any successful write marks every entry stale.
+    """
+
+    VERSION = 1
+    # Seconds a response is served without revalidation, by endpoint_template();
+    # anything not listed is always revalidated
+    DEFAULT_TTLS = {
+        '/api/v1/courses/:id/folders/by_path/:path': 24 * 3600,  # Folder ids don't change
+    }
+    STORED_HEADERS = ('Content-Type', 'Link', 'ETag', 'Last-Modified')
+    UNCACHED = {'/api/v1/progress/:id'}  # Polled until they change, never worth keeping
+
+    def __init__(self, path: Union[str, Path], max_entries: int = 1000, max_bytes: int = 32 * 1024 * 1024,
+                 ttls: Optional[Dict[str, float]] = None):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = dict(self.DEFAULT_TTLS if ttls is None else ttls)
+        self.entries = OrderedDict()  # URL -> entry dict, least recently used first
+        self.size = 0  # Total body bytes
+        self.dirty = False
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Union[str, Path], **kwargs) -> 'ResponseCache':
+        """Load a cache file, starting empty if it is missing or unreadable."""
+        cache = cls(path, **kwargs)
+        try:
+            with open(cache.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cache
+        if data.get('version') == cls.VERSION:
+            for url, entry in data.get('entries', []):
+                cache.entries[url] = entry
+                cache.size += len(entry['body'])
+            cache._evict()
+        return cache
+
+    def save(self) -> None:
+        """Write the cache atomically if anything changed."""
+        with self._lock:
+            if not self.dirty:
+                return
+            data = {'version': self.VERSION, 'entries': list(self.entries.items())}
+            self.dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """The cache key for a GET: its full URL, query included."""
+        return requests.Request('GET', url, params=params).prepare().url
+
+    def ttl(self, url: str) -> float:
+        return self.ttls.get(endpoint_template(url), 0.0)
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self.entries.get(url)
+            if entry is not None:
+                self.entries.move_to_end(url)
+            return entry
+
+    def is_fresh(self, url: str, entry: Dict[str, Any]) -> bool:
+        return not entry.get('stale') and time.time() - entry['stored_at'] < self.ttl(url)
+
+    @staticmethod
+    def validators(entry: Dict[str, Any]) -> Dict[str, str]:
+        """Conditional request headers for revalidating an entry."""
+        headers = {}
+        if entry['headers'].get('ETag'):
+            headers['If-None-Match'] = entry['headers']['ETag']
+        if entry['headers'].get('Last-Modified'):
+            headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+        return headers
+
+    def store(self, url: str, response: requests.Response) -> None:
+        """Cache a 200 response that carries a validator or a TTL."""
+        if endpoint_template(url) in self.UNCACHED:
+            return
+        headers = {name: response.headers[name] for name in self.STORED_HEADERS if name in response.headers}
+        if 'ETag' not in headers and 'Last-Modified' not in headers and not self.ttl(url):
+            return
+        entry = {'body': response.text, 'headers': headers, 'stored_at': time.time()}
+        with self._lock:
+            old = self.entries.pop(url, None)
+            if old is not None:
+                self.size -= len(old['body'])
+            self.entries[url] = entry
+            self.size += len(entry['body'])
+            self.dirty = True
+            self._evict()
+
+    def refresh(self, url: str, entry: Dict[str, Any], response: requests.Response) -> None:
+        """Mark an entry fresh again after a 304, taking any updated validators."""
+        with self._lock:
+            for name in ('ETag', 'Last-Modified'):
+                if name in response.headers:
+                    entry['headers'][name] = response.headers[name]
+            entry['stored_at'] = time.time()
+            entry.pop('stale', None)
+            self.dirty = True
+
+    def evict(self, url: str) -> None:
+        """Drop one entry, e.g. a folder lookup whose id Canvas no longer knows."""
+        with self._lock:
+            entry = self.entries.pop(url, None)
+            if entry is not None:
+                self.size -= len(entry['body'])
+                self.dirty = True
+
+    def invalidate(self) -> None:
+        """Make every entry revalidate before its next use (after Canvas was changed)."""
+        with self._lock:
+            for entry in self.entries.values():
+                entry['stale'] = True
+            self.dirty = True
+
+    def _evict(self) -> None:
+        while self.entries and (len(self.entries) > self.max_entries or self.size > self.max_bytes):
+            _, entry = self.entries.popitem(last=False)
+            self.size -= len(entry['body'])
+
+    @staticmethod
+    def response(url: str, entry: Dict[str, Any]) -> requests.Response:
+        """Rebuild a requests.Response from a cache entry."""
+        response = requests.Response()
+        response.status_code = 200
+        response._content = entry['body'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.headers.update(entry['headers'])
+        response.url = url
+        response.reason = 'OK'
+        return response
+
+class CanvasTransport:
+    """Pooled HTTP transport shared by every Canvas API call.
+
+    Wraps a single requests.Session so a sync run reuses a handful of warm
+    keep-alive connections instead of opening a new TCP+TLS connection per call.
+    With a ResponseCache, GETs are answered from it or revalidated conditionally.
+    """
+
+    def __init__(self, pool_size: int = 10, keep_alive: bool = True,
+                 timeout: Union[float, Tuple[float, float]] = (10, 120),
+                 session: Optional[requests.Session] = None,
+                 governor: Optional[RateLimitGovernor] = None,
+                 profiler: Optional[SyncProfiler] = None,
+                 cache: Optional[ResponseCache] = None):
+        self.timeout = timeout
+        self.profiler = profiler
+        self.cache = cache
+        self.requests_sent = 0  # Including retries
+        self.log_prefix = ""  # Prepended to retry messages
+        self._count_lock = threading.Lock()
+        self.governor = governor or RateLimitGovernor(max_concurrency=pool_size)
+        self.session = session or requests.Session()
+        if session is None:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request through the shared session, applying the default timeout.
+
+        Every request passes through the rate-limit governor, which may delay it
+        and retries throttled or failed responses.
+        """
+        if self.cache is None:
+            return self._send(method, url, **kwargs)
+        if method != 'GET':
+            response = self._send(method, url, **kwargs)
+            if response.ok and method not in ('HEAD', 'OPTIONS'):
+                self.cache.invalidate()
+            return response
+
+        key = self.cache.key(url, kwargs.get('params'))
+        entry = self.cache.lookup(key)
+        if entry is not None and self.cache.is_fresh(key, entry):
+            self.cache.hits += 1
+            return self.cache.response(key, entry)
+        if entry is not None:
+            kwargs['headers'] = {**(kwargs.get('headers') or {}), **self.cache.validators(entry)}
+
+        response = self._send(method, url, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self.cache.revalidated += 1
+            self.cache.refresh(key, entry, response)
+            return self.cache.response(key, entry)
+        self.cache.misses += 1
+        if response.status_code == 200:
+            self.cache.store(key, response)
+        return response
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+        while True:
+            with self._count_lock:
+                self.requests_sent += 1
+            with self.governor.slot():
+                started = time.perf_counter()
+                response = self.session.request(method, url, **kwargs)
+                if self.profiler is not None:
+                    self.profiler.record(method, response, time.perf_counter() - started)
+                self.governor.observe(response)
+            delay = self.governor.retry_delay(method, response, attempt)
+            if delay is None:
+                return response
+            print(f"{self.log_prefix}Canvas returned {response.status_code} for {method} {url}, retrying in {delay:.1f}s")
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+            # Rewind any file or streamed bodies so the retry sends them again
+            for file in list((kwargs.get('files') or {}).values()) + [kwargs.get('data')]:
+                if hasattr(file, 'seek'):
+                    file.seek(0)
+
+    def close(self) -> None:
+        """Close all pooled connections and save the response cache."""
+        self.session.close()
+        if self.cache is not None:
+            self.cache.save()
+
+def parse_lecture_item_title(title: str) -> Optional[Tuple[int, str]]:
+    """Return (lecture number, "Slides"/"Notes") for titles like "Lecture 6 - Slides"."""
+    if not title.startswith("Lecture ") or not (" - Slides" in title or " - Notes" in title):
+        return None
+    try:
+        lecture_num = int(title.split("Lecture ")[1].split(" -")[0])
+    except (ValueError, IndexError):
+        return None
+    return lecture_num, "Slides" if "- Slides" in title else "Notes"
+
+class ModuleItemIndex:
+    """In-memory index of one module's items.
+
+    Items are keyed by exact title and, for lecture materials, by
+    (lecture number, "Slides"/"Notes") so duplicate checks are dict lookups.
+    """
+
+    def __init__(self, items: List[Dict]):
+        self.items = []
+        self.by_title = {}
+        self.by_lecture = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item: Dict) -> None:
+        """Add an item (e.g. one just created) to the index."""
+        self.items.append(item)
+        self.by_title.setdefault(item['title'], item)
+        key = parse_lecture_item_title(item['title'])
+        if key is not None:
+            self.by_lecture.setdefault(key, item)
+
+    def find(self, title: str) -> Optional[Dict]:
+        """Return the item matching the title exactly or by lecture number and type."""
+        if title in self.by_title:
+            return self.by_title[title]
+        key = parse_lecture_item_title(title)
+        if key is not None:
+            return self.by_lecture.get(key)
+        return None
+
+    def lecture_numbers(self, material_type: str) -> set:
+        """Lecture numbers that already have an item of the given type."""
+        return {num for num, kind in self.by_lecture if kind == material_type}
+
+def parse_lecture_filename(filename: str) -> Optional[Tuple[str, int]]:
+    """Return ("Slides"/"Notes", lecture number) for lecture material filenames.
+
+    Slides look like "Lecture6_updated.pdf", notes like "Econ 2 Lecture 6 S25.pdf".
+    """
+    try:
+        if filename.startswith("Lecture"):
+            return "Slides", int(''.join(filter(str.isdigit, filename.split('_')[0])))
+        if filename.startswith("Econ 2 Lecture"):
+            parts = filename.split()
+            return "Notes", int(parts[parts.index("Lecture") + 1])
+    except (ValueError, IndexError):
+        pass
+    return None
+
+def folder_key(folder_path: Optional[str]) -> str:
+    """Normalize a local or Canvas folder path ("course files/lecture_slides") to its last component."""
+    return (folder_path or '').rstrip('/').rsplit('/', 1)[-1]
+
+class FileCache:
+    """Canvas files seen during a run, with secondary indexes maintained on insert.
+
+    Files are indexed by filename, by (folder, filename) and by
+    (folder, material kind, lecture number) so exact and similar lookups are O(1).
+    """
+
+    def __init__(self):
+        self.by_name = {}
+        self.by_folder_name = {}
+        self.by_lecture = {}
+        self.loaded_folders = set()  # Folders fully listed this run ('' means all files)
+
+    def __len__(self) -> int:
+        return len(self.by_name)
+
+    def add(self, file: Dict[str, Any], folder_path: Optional[str] = None) -> None:
+        """Add a file, using folder_path when Canvas did not report one."""
+        filename = file['filename']
+        folder = folder_key(file.get('folder_path') or folder_path)
+        self.by_name[filename] = file
+        self.by_folder_name[(folder, filename)] = file
+        lecture = parse_lecture_filename(filename)
+        if lecture is not None:
+            key = (folder,) + lecture
+            # Keep the first file seen per lecture, but let a replacement supersede it
+            if key not in self.by_lecture or self.by_lecture[key]['filename'] == filename:
+                self.by_lecture[key] = file
+
+    def is_loaded(self, folder_path: Optional[str]) -> bool:
+        """Whether the folder (or every file) was listed during this run."""
+        return '' in self.loaded_folders or folder_key(folder_path) in self.loaded_folders
+
+    def find(self, filename: str, folder_path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Return the file with this exact name, restricted to folder_path if given."""
+        if not folder_path:
+            return self.by_name.get(filename)
+        return self.by_folder_name.get((folder_key(folder_path), filename))
+
+    def find_similar(self, filename: str, folder_path: str) -> Optional[Dict[str, Any]]:
+        """Return a file in folder_path for the same lecture number and material kind."""
+        lecture = parse_lecture_filename(filename)
+        if lecture is None:
+            return None
+        return self.by_lecture.get((folder_key(folder_path),) + lecture)
+
+def file_digest(path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 hex digest of a file, read in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class SyncManifest:
+    """Local record of what each synced file looks like and where it lives in Canvas.
+
+    Entries are keyed by the file's path relative to the repo root and store its
+    size, mtime, content hash, Canvas file id and module item id. A file whose
+    size and mtime (or, failing that, hash) still match is skipped on the next
+    run; the only request it costs is the module listing that confirms its
+    module still exists.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Union[str, Path], course_id: str):
+        self.path = Path(path)
+        self.course_id = str(course_id)
+        self.modules = {}  # Module name -> Canvas module id
+        self.folders = {}  # Course folder path -> Canvas folder id
+        self.files = {}  # Relative path -> entry dict
+        self.dirty = False
+        self.digest = file_digest  # Swapped for LocalScan.digest when several courses share one scan
+
+    @classmethod
+    def load(cls, path: Union[str, Path], course_id: str) -> 'SyncManifest':
+        """Load a manifest, starting empty if it is missing, unreadable or for another course."""
+        manifest = cls(path, course_id)
+        try:
+            with open(manifest.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return manifest
+        if data.get('version') == cls.VERSION and str(data.get('course_id')) == manifest.course_id:
+            manifest.modules = data.get('modules', {})
+            manifest.folders = data.get('folders', {})
+            manifest.files = data.get('files', {})
+        return manifest
+
+    def save(self) -> None:
+        """Write the manifest atomically if anything changed."""
+        if not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            'version': self.VERSION,
+            'course_id': self.course_id,
+            'modules': self.modules,
+            'folders': self.folders,
+            'files': self.files,
+        }
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def reset(self) -> None:
+        """Forget everything so the next sync rebuilds the manifest from Canvas."""
+        self.modules = {}
+        self.folders = {}
+        self.files = {}
+        self.dirty = True
+
+    @staticmethod
+    def key(path: Union[str, Path]) -> str:
+        return Path(path).as_posix()
+
+    def is_current(self, path: Union[str, Path]) -> bool:
+        """Whether the file is unchanged since it was last synced to Canvas."""
+        entry = self.files.get(self.key(path))
+        if not entry or entry.get('item_id') is None:
+            return False
+        stat = os.stat(path)
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime_ns == entry['mtime_ns']:
+            return True
+        # Touched but possibly not edited: fall back to comparing content
+        if self.digest(path) != entry['sha256']:
+            return False
+        entry['mtime_ns'] = stat.st_mtime_ns
+        self.dirty = True
+        return True
+
+    def record(self, path: Union[str, Path], module_id: Any, item_id: Any,
+               file_id: Optional[Any] = None) -> None:
+        """Record the current state of a synced file and its Canvas ids."""
+        stat = os.stat(path)
+        self.files[self.key(path)] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': self.digest(path),
+            'file_id': file_id,
+            'module_id': module_id,
+            'item_id': item_id,
+        }
+        self.dirty = True
+
+    def forget_module(self, module_id: Any) -> None:
+        """Drop a deleted module and every file entry that pointed into it."""
+        self.modules = {name: mid for name, mid in self.modules.items() if str(mid) != str(module_id)}
+        self.files = {key: entry for key, entry in self.files.items()
+                      if str(entry.get('module_id')) != str(module_id)}
+        self.dirty = True
+
+# Called as progress(filename, bytes_sent, total_bytes, elapsed_seconds) while an upload streams
+ProgressCallback = Callable[[str, int, int, float], None]
+
+class MultipartFileStream:
+    """multipart/form-data body that streams one file from disk in fixed-size chunks.
+
+    The form fields and part headers are encoded up front; the file itself is only
+    read chunk by chunk as the request is sent, so memory use does not depend on
+    file size. The total length is known in advance, so requests sends a normal
+    Content-Length body rather than a chunked one.
+    """
+
+    def __init__(self, fields: Dict[str, Any], filepath: str, field_name: str = 'file',
+                 chunk_size: int = 64 * 1024, progress: Optional[ProgressCallback] = None):
+        self.filepath = filepath
+        self.filename = os.path.basename(filepath)
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+
+        preamble = []
+        for name, value in fields.items():
+            preamble.append(f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n')
+        quoted = self.filename.replace('"', '%22').replace('\r', '%0D').replace('\n', '%0A')
+        mime_type = mimetypes.guess_type(self.filename)[0] or 'application/octet-stream'
+        preamble.append(f'--{self.boundary}\r\nContent-Disposition: form-data; name="{field_name}"; '
+                        f'filename="{quoted}"\r\nContent-Type: {mime_type}\r\n\r\n')
+        self._preamble = ''.join(preamble).encode()
+        self._epilogue = f'\r\n--{self.boundary}--\r\n'.encode()
+        self._file_size = os.path.getsize(filepath)
+        self._length = len(self._preamble) + self._file_size + len(self._epilogue)
+        self._file = None
+        self._position = 0
+        self._started = None
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        """Rewind for a retry; only seeking back to the start is supported."""
+        if offset != 0 or whence != 0:
+            raise io.UnsupportedOperation("MultipartFileStream can only be rewound to the start")
+        self.close()
+        self._position = 0
+        self._started = None
+        return 0
+
+    def read(self, size: int = -1) -> bytes:
+        """Return up to size bytes of the body (the rest of it if size is negative)."""
+        if self._started is None:
+            self._started = time.perf_counter()
+        remaining = self._length - self._position
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+
+        chunks = []
+        while size > 0:
+            if self._position < len(self._preamble):
+                chunk = self._preamble[self._position:self._position + size]
+            elif self._position < len(self._preamble) + self._file_size:
+                if self._file is None:
+                    self._file = open(self.filepath, 'rb')
+                    self._file.seek(self._position - len(self._preamble))
+                chunk = self._file.read(min(size, len(self._preamble) + self._file_size - self._position))
+                if not chunk:
+                    raise IOError(f"{self.filepath} shrank while it was being uploaded")
+            else:
+                offset = self._position - len(self._preamble) - self._file_size
+                chunk = self._epilogue[offset:offset + size]
+            chunks.append(chunk)
+            self._position += len(chunk)
+            size -= len(chunk)
+
+        if self._file is not None and self._position >= len(self._preamble) + self._file_size:
+            self.close()
+        if self.progress is not None and chunks:
+            self.progress(self.filename, self._position, self._length, time.perf_counter() - self._started)
+        return b''.join(chunks)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+PAGES_URL = "https://matthewdlang18.github.io/macroeconomics-course-website"
+
+@dataclass
+class Material:
+    """Where a local course file belongs in Canvas.
+
+    Files are uploaded to folder_path; activities have no folder and link to url instead.
+    """
+    module_name: str
+    module_position: int
+    folder_path: Optional[str]
+    title: str
+    position: int
+    url: Optional[str] = None
+
+def classify_material(path: Union[str, Path]) -> Optional[Material]:
+    """Work out the module item for a local course file.
+
+    Handles the syllabus, lecture slides and notes, activity pages and review
+    session PDFs. Returns None for anything sync_materials wouldn't publish.
+    """
+    path = Path(path)
+    if path.name == "index.html" and path.parent.parent.name == "activities":
+        try:
+            activity_num = int(path.parent.name.replace('activity', ''))
+        except ValueError:
+            return None
+        # Activities are served from GitHub Pages and linked, not uploaded
+        return Material("Discussion Activities", 3, None, f"Activity {activity_num}", activity_num,
+                        url=f"{PAGES_URL}/activities/activity{activity_num}/index.html")
+    if path.suffix.lower() != '.pdf':
+        return None
+    try:
+        if path.as_posix().endswith("course_materials/syllabus.pdf"):
+            # Course Information is manually managed apart from the syllabus
+            return Material("Course Information", 1, "course_materials", "Course Syllabus", 1)
+        if path.parent.name == "lecture_slides":
+            # "Lecture1_updated.pdf"
+            lecture_num = int(''.join(filter(str.isdigit, path.stem.split('_')[0])))
+            return Material("Lecture Materials", 2, "lecture_slides",
+                            f"Lecture {lecture_num} - Slides", lecture_num * 2 - 1)
+        if path.parent.name == "lecture_notes":
+            # "Econ 2 Lecture 1 S25.pdf"
+            parts = path.stem.split()
+            lecture_num = int(parts[parts.index("Lecture") + 1])
+            return Material("Lecture Materials", 2, "lecture_notes",
+                            f"Lecture {lecture_num} - Notes", lecture_num * 2)
+        if path.parent.name == "review_session" and path.match("Week*ReviewSession.pdf"):
+            week_num = int(''.join(filter(str.isdigit, path.stem.split('Week')[1].split('Review')[0])))
+            if week_num != 5:  # Week 5 is never published
+                return Material("Review Sessions", 4, "review_session",
+                                f"Week {week_num} Review Questions", week_num)
+    except (ValueError, IndexError):
+        pass
+    return None
+
+# Profiler name for each upload folder's materials; activities have no folder
+MATERIAL_KINDS = {
+    "course_materials": "syllabus",
+    "lecture_slides": "slides",
+    "lecture_notes": "notes",
+    "review_session": "reviews",
+}
+
+def material_kind(material: Material) -> str:
+    """"slides", "notes", "activities", "reviews" or "syllabus"."""
+    if material.folder_path is None:
+        return "activities"
+    return MATERIAL_KINDS.get(material.folder_path, material.folder_path)
+
+def discover_materials(root: Union[str, Path] = ".") -> List[Tuple[Path, Material]]:
+    """Every local file sync_materials publishes, with its Material.
+
+    When two files map to the same module item (e.g. two slide decks for one
+    lecture), the first in sorted order wins.
+    """
+    root = Path(root)
+    candidates = [root / "course_materials" / "syllabus.pdf"]
+    candidates += sorted((root / "lecture_slides").glob("*.pdf"))
+    candidates += sorted((root / "lecture_notes").glob("*.pdf"))
+    candidates += sorted((root / "activities").glob("activity*/index.html"))
+    candidates += sorted((root / "review_session").glob("Week*ReviewSession.pdf"))
+
+    materials = []
+    seen = set()
+    for path in candidates:
+        material = classify_material(path) if path.exists() else None
+        if material is None:
+            continue
+        key = (material.module_name, material.title)
+        if key in seen:
+            print(f"Skipping duplicate {path.name} for '{material.title}'")
+            continue
+        seen.add(key)
+        materials.append((path, material))
+    return materials
+
+class LocalScan:
+    """One pass over the local tree, shared by every course a sync fans out to.
+
+    Holds the discovered materials and memoizes each file's sha256 by path, size
+    and mtime, so however many courses are synced each file is found, parsed and
+    hashed once.
+    """
+
+    def __init__(self, root: Union[str, Path] = "."):
+        self.materials = discover_materials(root)
+        self._digests = {}  # (path, size, mtime_ns) -> sha256
+        self._locks = {}  # Same keys -> lock held while that file is hashed
+        self._lock = threading.Lock()
+
+    def digest(self, path: Union[str, Path]) -> str:
+        """sha256 of a file, hashed at most once while it stays unchanged."""
+        stat = os.stat(path)
+        key = (SyncManifest.key(path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            # Another course may have hashed it while we waited
+            if key not in self._digests:
+                self._digests[key] = file_digest(path)
+            return self._digests[key]
+
+@dataclass
+class PlannedFile:
+    """What the sync plan does with one local file."""
+    path: Path
+    material: Material
+    upload: Optional[str] = None  # "new", "replace", or None when Canvas already has these bytes
+    existing_file: Optional[Dict] = None  # Canvas copy of the file, if any
+    item: Optional[Dict] = None  # Existing module item, None if one has to be created
+
+@dataclass
+class SyncPlan:
+    """Changes that bring Canvas in line with the local tree, computed before any are made."""
+    new_modules: List[Tuple[str, int]] = field(default_factory=list)  # (name, position)
+    files: List[PlannedFile] = field(default_factory=list)
+    moves: List[Tuple[str, Dict, int]] = field(default_factory=list)  # (module name, item, new position)
+    snapshot_requests: int = 0  # Read-only requests spent building the remote snapshot
+    errors: List[str] = field(default_factory=list)  # Failures while executing the plan
+    requests_per_upload: int = 2  # Direct uploads; URL uploads also probe the site, poll progress and fetch the file
+
+    @property
+    def uploads(self) -> List[PlannedFile]:
+        return [planned for planned in self.files if planned.upload]
+
+    @property
+    def new_items(self) -> List[PlannedFile]:
+        return [planned for planned in self.files if planned.item is None]
+
+    def request_count(self) -> int:
+        """Requests executing the plan should take: a few per upload, one per module, item or move."""
+        return (len(self.new_modules) + self.requests_per_upload * len(self.uploads)
+                + len(self.new_items) + len(self.moves))
+
+    def describe(self) -> str:
+        lines = []
+        for name, position in self.new_modules:
+            lines.append(f"  create module   {name} (position {position})")
+        for planned in self.uploads:
+            lines.append(f"  {planned.upload + ' file':<15} {planned.material.folder_path}/{planned.path.name}")
+        for name, item, position in self.moves:
+            lines.append(f"  move item       {name}: {item['title']} "
+                         f"(position {item.get('position')} -> {position})")
+        for planned in self.new_items:
+            lines.append(f"  create item     {planned.material.module_name}: {planned.material.title} "
+                         f"(position {planned.material.position})")
+        up_to_date = sum(1 for planned in self.files if not planned.upload and planned.item is not None)
+        lines.append(f"{len(self.uploads)} uploads, {len(self.new_items)} new items, {len(self.moves)} moves, "
+                     f"{up_to_date} already up to date: about {self.request_count()} requests "
+                     f"(after {self.snapshot_requests} to read the current state)")
+        return "\n".join(lines)
 
 class CanvasIntegrator:
-    def __init__(self, api_token: str, course_id: str, base_url: str = "https://ucsb.instructure.com"):
+    def __init__(self, api_token: str, course_id: str, base_url: str = "https://ucsb.instructure.com",
+                 transport: Optional[CanvasTransport] = None, manifest: Optional[SyncManifest] = None):
         self.api_token = api_token
         self.course_id = course_id
         self.base_url = base_url.rstrip('/')
         self.headers = {
             'Authorization': f'Bearer {api_token}'
         }
+        self.transport = transport or CanvasTransport()
+        self.manifest = manifest
         self._modules = {}  # Cache for created modules
-        self._files_cache = {}  # Cache for existing files
+        self._files_cache = FileCache()  # Cache for existing files
+        self._folder_ids = {}  # Course folder path -> Canvas folder id (None if missing)
+        self.page_prefetch = 4  # Max concurrent page requests for paginated listings
+        self.upload_progress = None  # Default ProgressCallback for upload_file
+        self.upload_source = None  # Published site Canvas can fetch files from (None uploads them directly)
+        self.progress_poll_interval = 0.5  # First wait between polls of a URL upload's progress
+        self.progress_timeout = 600.0  # Give up waiting on a URL upload after this many seconds
+        self.site_session = None  # Plain session for probing upload_source, created on first use
+        self._publish_lock = threading.Lock()  # Serializes item creation and manifest writes in publish_file
+        self._module_items = {}  # ModuleItemIndex per module id, loaded once per sync
+        self.log_prefix = ""  # e.g. "[12345] " so output from courses synced together can be told apart
+        self._progress_steps = {}  # Last 25% step print_upload_progress showed per file
+        self._progress_lock = threading.Lock()  # Upload workers report progress concurrently
+
+    def _print(self, message: str) -> None:
+        """Print a progress message, prefixing every line with log_prefix."""
+        if not self.log_prefix:
+            print(message)
+            return
+        print("\n".join(self.log_prefix + line for line in str(message).split("\n")))
+
+    def print_upload_progress(self, filename: str, sent: int, total: int, elapsed: float) -> None:
+        """Progress callback for the CLI: prints each upload at 25% steps with its throughput."""
+        step = 4 * sent // total if total else 4
+        with self._progress_lock:
+            if self._progress_steps.get(filename, -1) == step:
+                return
+            self._progress_steps[filename] = step
+            if sent >= total:
+                self._progress_steps.pop(filename, None)
+        rate = sent / elapsed / 1024 if elapsed > 0 else 0.0
+        self._print(f"  {filename}: {sent * 100 // max(total, 1)}% of {total} bytes ({rate:.0f} KiB/s)")
+
+    def _phase(self, name: Optional[str]) -> None:
+        """Mark the start of a sync phase when profiling (None ends the last one)."""
+        if self.transport.profiler is not None:
+            self.transport.profiler.mark_phase(name)
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        """Authenticated GET through the shared transport."""
+        return self.transport.request('GET', url, headers=self.headers, **kwargs)
+
+    def _post(self, url: str, **kwargs) -> requests.Response:
+        """Authenticated POST through the shared transport."""
+        return self.transport.request('POST', url, headers=self.headers, **kwargs)
+
+    def _put(self, url: str, **kwargs) -> requests.Response:
+        """Authenticated PUT through the shared transport."""
+        return self.transport.request('PUT', url, headers=self.headers, **kwargs)
+
+    def _delete(self, url: str, **kwargs) -> requests.Response:
+        """Authenticated DELETE through the shared transport."""
+        return self.transport.request('DELETE', url, headers=self.headers, **kwargs)
 
     def get_or_create_module(self, name: str, position: Optional[int] = None) -> Dict:
         """Get existing module or create a new one."""
         if name in self._modules:
             return self._modules[name]
 
-        # List existing modules
-        url = f"{self.base_url}/api/v1/courses/{self.course_id}/modules"
-        response = requests.get(url, headers=self.headers)
-        response.raise_for_status()
+        # Module ids remembered from a previous run need no lookup
+        if self.manifest is not None and name in self.manifest.modules:
+            module = {'id': self.manifest.modules[name], 'name': name}
+            self._modules[name] = module
+            return module
 
-        # Check if module exists
-        for module in response.json():
-            if module['name'] == name:
-                self._modules[name] = module
-                return module
+        self.list_modules()
+        if name not in self._modules:
+            return self.create_module(name, position)
+
+        module = self._modules[name]
+        if self.manifest is not None:
+            self.manifest.modules[name] = module['id']
+            self.manifest.dirty = True
+        return module
 
-        # Create new module if it doesn't exist
+    def list_modules(self) -> List[Dict]:
+        """List the course's modules, caching each one by name."""
+        url = f"{self.base_url}/api/v1/courses/{self.course_id}/modules"
+        modules = self._get_all_pages(url, {'per_page': 100})
+        # Cache every listed module so later lookups skip the request
+        for module in modules:
+            self._modules.setdefault(module['name'], module)
+        return modules
+
+    def create_module(self, name: str, position: Optional[int] = None) -> Dict:
+        """Create a module; it starts out with an empty item index."""
+        url = f"{self.base_url}/api/v1/courses/{self.course_id}/modules"
         data = {'module[name]': name}
         if position is not None:
             data['module[position]'] = position
 
-        response = requests.post(url, headers=self.headers, data=data)
+        response = self._post(url, data=data)
         response.raise_for_status()
         module = response.json()
         self._modules[name] = module
+        self._module_items[str(module['id'])] = ModuleItemIndex([])
+        if self.manifest is not None:
+            self.manifest.modules[name] = module['id']
+            self.manifest.dirty = True
         return module
 
-    def get_files_in_folder(self, folder_path: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get all files in a specific folder path."""
-        url = f"{self.base_url}/api/v1/courses/{self.course_id}/files"
-        params = {'per_page': 100}
-        if folder_path:
-            params['search_term'] = folder_path
+    def _get_json(self, url: str, **kwargs) -> Any:
+        """GET a URL and return its decoded JSON body."""
+        response = self._get(url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _page_urls(next_url: str, last_url: str) -> List[str]:
+        """Expand numbered pagination links into every remaining page URL.
 
-        all_files = []
-        response = requests.get(url, headers=self.headers, params=params)
+        Returns an empty list when Canvas uses opaque bookmarks instead of page numbers.
+        """
+        next_parts = urlsplit(next_url)
+        next_query = parse_qs(next_parts.query)
+        last_query = parse_qs(urlsplit(last_url).query)
+        try:
+            first = int(next_query['page'][0])
+            last = int(last_query['page'][0])
+        except (KeyError, ValueError):
+            return []
+
+        urls = []
+        for page in range(first, last + 1):
+            next_query['page'] = [str(page)]
+            urls.append(urlunsplit(next_parts._replace(query=urlencode(next_query, doseq=True))))
+        return urls
+
+    def _get_all_pages(self, url: str, params: Optional[Dict] = None) -> List:
+        """GET every page of a paginated list endpoint.
+
+        When the Link header exposes numbered next and last pages, the remaining
+        pages are fetched concurrently; otherwise next links are followed in order.
+        """
+        response = self._get(url, params=params)
         response.raise_for_status()
-        files = response.json()
-        all_files.extend(files)
+        results = list(response.json())
+
+        next_url = response.links.get('next', {}).get('url')
+        last_url = response.links.get('last', {}).get('url')
+        page_urls = self._page_urls(next_url, last_url) if next_url and last_url else []
+        if page_urls and self.page_prefetch > 1:
+            with ThreadPoolExecutor(max_workers=min(self.page_prefetch, len(page_urls))) as executor:
+                for page in executor.map(self._get_json, page_urls):
+                    results.extend(page)
+            return results
 
         # Handle pagination if needed
         while 'next' in response.links:
-            response = requests.get(response.links['next']['url'], headers=self.headers)
+            response = self._get(response.links['next']['url'])
             response.raise_for_status()
-            files = response.json()
-            all_files.extend(files)
+            results.extend(response.json())
+
+        return results
+
+    def get_folder_id(self, folder_path: str) -> Optional[Any]:
+        """Resolve a course folder path to its Canvas folder id, or None if it doesn't exist."""
+        if folder_path in self._folder_ids:
+            return self._folder_ids[folder_path]
+        if self.manifest is not None and folder_path in self.manifest.folders:
+            self._folder_ids[folder_path] = self.manifest.folders[folder_path]
+            return self._folder_ids[folder_path]
+
+        response = self._get(self._folder_url(folder_path))
+        if response.status_code == 404:
+            self._folder_ids[folder_path] = None
+            return None
+        response.raise_for_status()
+        # by_path returns every folder along the path, ending with the one we asked for
+        folder_id = response.json()[-1]['id']
+        self._folder_ids[folder_path] = folder_id
+        if self.manifest is not None:
+            self.manifest.folders[folder_path] = folder_id
+            self.manifest.dirty = True
+        return folder_id
+
+    def _folder_url(self, folder_path: str) -> str:
+        return f"{self.base_url}/api/v1/courses/{self.course_id}/folders/by_path/{quote(folder_path)}"
+
+    def forget_folder(self, folder_path: str) -> None:
+        """Drop every remembered id for a folder so the next lookup asks Canvas again."""
+        self._folder_ids.pop(folder_path, None)
+        if self.manifest is not None and self.manifest.folders.pop(folder_path, None) is not None:
+            self.manifest.dirty = True
+        if self.transport.cache is not None:
+            self.transport.cache.evict(self.transport.cache.key(self._folder_url(folder_path)))
+
+    def get_files_in_folder(self, folder_path: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get all files in a specific folder path (or the whole course if none is given)."""
+        params = {'per_page': 100}
+        if folder_path:
+            for attempt in range(2):
+                folder_id = self.get_folder_id(folder_path)
+                if folder_id is None:
+                    all_files = []
+                    break
+                try:
+                    all_files = self._get_all_pages(f"{self.base_url}/api/v1/folders/{folder_id}/files", params)
+                    break
+                except requests.exceptions.HTTPError as e:
+                    if e.response is None or e.response.status_code != 404 or attempt:
+                        raise
+                    # Folder id remembered from an earlier run (or cached lookup) no longer exists;
+                    # look it up once more
+                    self.forget_folder(folder_path)
+        else:
+            all_files = self._get_all_pages(f"{self.base_url}/api/v1/courses/{self.course_id}/files", params)
 
         # Cache files by name for quick lookup
         for file in all_files:
-            self._files_cache[file['filename']] = file
+            self._files_cache.add(file, folder_path)
+        self._files_cache.loaded_folders.add(folder_key(folder_path))
 
         return all_files
 
@@ -73,250 +1257,267 @@ class CanvasIntegrator:
 
         For lecture materials, also tries to find files with similar names to prevent duplicates.
         """
-        # Debug for Lecture 6
-        is_lecture6 = "Lecture6" in filename or "Lecture 6" in filename
-        if is_lecture6:
-            print(f"\n==== LOOKING FOR FILE: '{filename}' in '{folder_path}' ====")
-            print(f"Cache has {len(self._files_cache)} files")
+        logger.debug("Looking for file '%s' in '%s' (%d cached)", filename, folder_path, len(self._files_cache))
 
         # Check cache first for exact match
-        if filename in self._files_cache:
-            file = self._files_cache[filename]
-            # If folder path is specified, check if the file is in that folder
-            if folder_path and folder_path not in file.get('folder_path', ''):
-                if is_lecture6:
-                    print(f"Found exact filename match but wrong folder: {file.get('folder_path', '')}")
-                return None
-            if is_lecture6:
-                print(f"EXACT MATCH FOUND for '{filename}' in cache")
-            return file
-
-        # If not in cache, fetch all files in the folder
-        if is_lecture6:
-            print(f"No exact match in cache, fetching files from folder '{folder_path}'")
-        self.get_files_in_folder(folder_path)
-
-        # Check cache again for exact match
-        if filename in self._files_cache:
-            file = self._files_cache[filename]
-            # If folder path is specified, check if the file is in that folder
-            if folder_path and folder_path not in file.get('folder_path', ''):
-                if is_lecture6:
-                    print(f"Found exact filename match after fetch but wrong folder: {file.get('folder_path', '')}")
-                return None
-            if is_lecture6:
-                print(f"EXACT MATCH FOUND for '{filename}' after fetching")
+        file = self._files_cache.find(filename, folder_path)
+        if file is None and not self._files_cache.is_loaded(folder_path):
+            # Only fetch when this folder hasn't been listed during this run
+            logger.debug("No exact match in cache, fetching files from folder '%s'", folder_path)
+            self.get_files_in_folder(folder_path)
+            file = self._files_cache.find(filename, folder_path)
+
+        if file is not None:
+            logger.debug("Exact match found for '%s' (id %s)", filename, file.get('id'))
             return file
 
         # For lecture materials, try to find similar files to prevent duplicates
-        if folder_path in ["lecture_slides", "lecture_notes"] and (filename.startswith("Lecture") or filename.startswith("Econ 2 Lecture")):
-            try:
-                # Extract lecture number
-                lecture_num = None
-                if filename.startswith("Lecture"):
-                    # For slides: "Lecture6_updated.pdf"
-                    lecture_num = int(''.join(filter(str.isdigit, filename.split('_')[0])))
-                    if is_lecture6:
-                        print(f"Extracted lecture number {lecture_num} from slides filename '{filename}'")
-                else:
-                    # For notes: "Econ 2 Lecture 6 S25.pdf"
-                    parts = filename.split()
-                    lecture_num = int(parts[parts.index("Lecture") + 1])
-                    if is_lecture6:
-                        print(f"Extracted lecture number {lecture_num} from notes filename '{filename}'")
-
-                # Look for files with the same lecture number
-                if is_lecture6:
-                    print(f"Looking for files with lecture number {lecture_num}")
-
-                for cached_filename, file in self._files_cache.items():
-                    if folder_path and folder_path not in file.get('folder_path', ''):
-                        if is_lecture6 and "Lecture" in cached_filename:
-                            print(f"Skipping '{cached_filename}' due to wrong folder: {file.get('folder_path', '')}")
-                        continue
+        if folder_path in ["lecture_slides", "lecture_notes"]:
+            file = self._files_cache.find_similar(filename, folder_path)
+            if file is not None:
+                self._print(f"Found similar file: '{file['filename']}' that matches '{filename}'")
+                return file
 
-                    try:
-                        cached_lecture_num = None
-                        if cached_filename.startswith("Lecture"):
-                            cached_lecture_num = int(''.join(filter(str.isdigit, cached_filename.split('_')[0])))
-                            if is_lecture6 and cached_lecture_num == 6:
-                                print(f"Found slides with lecture number {cached_lecture_num}: '{cached_filename}'")
-                        elif cached_filename.startswith("Econ 2 Lecture"):
-                            cached_parts = cached_filename.split()
-                            cached_lecture_num = int(cached_parts[cached_parts.index("Lecture") + 1])
-                            if is_lecture6 and cached_lecture_num == 6:
-                                print(f"Found notes with lecture number {cached_lecture_num}: '{cached_filename}'")
-
-                        if cached_lecture_num == lecture_num:
-                            print(f"Found similar file: '{cached_filename}' that matches '{filename}'")
-                            if is_lecture6:
-                                print(f"SIMILAR MATCH FOUND: '{cached_filename}' for '{filename}'")
-                            return file
-                    except (ValueError, IndexError) as e:
-                        if is_lecture6 and "Lecture" in cached_filename:
-                            print(f"Error parsing '{cached_filename}': {str(e)}")
-                        continue
-            except (ValueError, IndexError) as e:
-                # If we can't parse the lecture number, fall back to exact match only
-                if is_lecture6:
-                    print(f"Error extracting lecture number from '{filename}': {str(e)}")
-                pass
+        logger.debug("No match found for '%s'", filename)
+        return None
 
-        if is_lecture6:
-            print(f"NO MATCH FOUND for '{filename}'")
+    def _content_changed(self, filepath: str, existing_file: Dict[str, Any]) -> bool:
+        """Whether a local file differs from its Canvas copy.
 
-        return None
+        Sizes are compared first. When they match, the local hash is compared with
+        the one the manifest stored for that Canvas file; without a stored hash
+        the file is assumed unchanged.
+        """
+        size = os.path.getsize(filepath)
+        if existing_file.get('size') is not None and existing_file['size'] != size:
+            return True
+        if self.manifest is None:
+            return False
+        entry = self.manifest.files.get(SyncManifest.key(filepath))
+        if not entry or str(entry.get('file_id')) != str(existing_file.get('id')):
+            return False
+        if entry['size'] != size:
+            return True
+        return self.manifest.digest(filepath) != entry['sha256']
 
-    def upload_file(self, filepath: str, folder_path: Optional[str] = None) -> Dict:
-        """Upload a file to Canvas if it doesn't already exist."""
-        filename = os.path.basename(filepath)
-        is_lecture6 = "Lecture6" in filename or "Lecture 6" in filename
+    def upload_file(self, filepath: str, folder_path: Optional[str] = None,
+                    progress: Optional[ProgressCallback] = None) -> Dict:
+        """Upload a file to Canvas unless an identical copy already exists.
 
-        if is_lecture6:
-            print(f"\n==== UPLOADING FILE: '{filename}' to '{folder_path}' ====")
+        If a matching Canvas file exists but its content differs, the new bytes are
+        uploaded over it (same name and folder) so module items linking to it stay valid.
+        The file is streamed from disk; progress (or self.upload_progress) is called as it goes.
+        """
+        filename = os.path.basename(filepath)
+        logger.debug("Uploading '%s' to '%s'", filename, folder_path)
 
         # Check if file already exists
         existing_file = self.get_file_by_name(filename, folder_path)
-        if existing_file:
-            print(f"File {filename} already exists in Canvas, using existing file.")
-            if is_lecture6:
-                print(f"Using existing file with ID: {existing_file.get('id')}")
-                print(f"Existing file details: {existing_file.get('filename')}, {existing_file.get('display_name')}")
+        if existing_file and not self._content_changed(filepath, existing_file):
+            self._print(f"File {filename} already exists in Canvas, using existing file.")
+            logger.debug("Existing file id %s: %s (%s)", existing_file.get('id'),
+                         existing_file.get('filename'), existing_file.get('display_name'))
             return existing_file
 
-        # Special handling for Lecture 6 - double check by listing all files in the folder
-        if is_lecture6:
-            print("Double-checking for Lecture 6 files in Canvas...")
-            all_files = self.get_files_in_folder(folder_path)
-            print(f"Found {len(all_files)} files in folder '{folder_path}'")
-
-            # Look for any file that might be Lecture 6
-            for file in all_files:
-                file_name = file.get('filename', '')
-                if ("Lecture6" in file_name or "Lecture 6" in file_name) and folder_path in file.get('folder_path', ''):
-                    print(f"Found potential match for Lecture 6: {file_name}")
-                    print(f"Using existing file with ID: {file.get('id')}")
-                    return file
+        # File doesn't exist or has changed, proceed with upload
+        return self._send_file(filepath, folder_path, existing_file, progress)
 
-            print("No existing Lecture 6 file found after thorough check, proceeding with upload")
-
-        # File doesn't exist, proceed with upload
-        url = f"{self.base_url}/api/v1/courses/{self.course_id}/files"
+    def _upload_params(self, filepath: str, folder_path: Optional[str],
+                       existing_file: Optional[Dict] = None, overwrite: bool = False) -> Dict[str, Any]:
+        """Form fields for step one of a Canvas file upload.
 
+        overwrite replaces any same-named file in the folder even without an
+        existing_file, e.g. one a URL upload job may have created meanwhile.
+        """
+        filename = os.path.basename(filepath)
         data = {
             'name': filename,
             'parent_folder_path': folder_path,
         }
 
-        if is_lecture6:
-            print(f"Initiating upload request for '{filename}'")
+        if existing_file:
+            # Overwrite the existing file in place instead of adding a second copy
+            self._print(f"File {filename} changed, replacing '{existing_file['filename']}' in Canvas.")
+            data['name'] = existing_file.get('display_name') or existing_file['filename']
+            data['on_duplicate'] = 'overwrite'
+        elif overwrite:
+            data['on_duplicate'] = 'overwrite'
+        return data
+
+    def _send_file(self, filepath: str, folder_path: Optional[str], existing_file: Optional[Dict] = None,
+                   progress: Optional[ProgressCallback] = None) -> Dict:
+        """Upload a file's bytes, overwriting existing_file in place when given.
+
+        With upload_source set, Canvas is asked to fetch the file from the
+        published site first; the bytes are only sent from here if that fails.
+        """
+        filename = os.path.basename(filepath)
+        if self.upload_source:
+            try:
+                file_data = self._send_file_by_url(filepath, folder_path, existing_file)
+                if file_data is not None:
+                    return file_data
+            except requests.exceptions.RequestException as e:
+                self._print(f"URL upload of {filename} failed ({e}), uploading it directly.")
 
-        response = requests.post(url, headers=self.headers, data=data)
+        url = f"{self.base_url}/api/v1/courses/{self.course_id}/files"
+        # A URL upload job that timed out may still finish; overwriting means
+        # whichever copy lands last replaces the other instead of duplicating it
+        data = self._upload_params(filepath, folder_path, existing_file, overwrite=bool(self.upload_source))
+        response = self._post(url, data=data)
         response.raise_for_status()
         upload_data = response.json()
+        logger.debug("Got upload URL for '%s', sending file content", filename)
 
-        if is_lecture6:
-            print(f"Got upload URL, sending file content")
-
-        with open(filepath, 'rb') as file:
-            files = {'file': file}
-            response = requests.post(upload_data['upload_url'], data=upload_data['upload_params'], files=files)
+        body = MultipartFileStream(upload_data['upload_params'], filepath,
+                                   progress=progress or self.upload_progress)
+        try:
+            response = self.transport.request('POST', upload_data['upload_url'], data=body,
+                                              headers={'Content-Type': body.content_type})
             response.raise_for_status()
+        finally:
+            body.close()
 
         # Add to cache
         file_data = response.json()
-        self._files_cache[filename] = file_data
-
-        if is_lecture6:
-            print(f"Successfully uploaded '{filename}' with ID: {file_data.get('id')}")
+        self._files_cache.add(file_data, folder_path)
 
+        logger.debug("Uploaded '%s' with id %s", filename, file_data.get('id'))
         return file_data
 
-    def get_module_items(self, module_id: str) -> List:
-        """Get all items in a module."""
-        url = f"{self.base_url}/api/v1/courses/{self.course_id}/modules/{module_id}/items"
-        params = {'per_page': 100}  # Get more items per page
+    def published_url(self, filepath: str) -> str:
+        """Where the published site serves a repo file."""
+        return f"{self.upload_source.rstrip('/')}/{quote(Path(filepath).as_posix())}"
+
+    def _send_file_by_url(self, filepath: str, folder_path: Optional[str],
+                          existing_file: Optional[Dict] = None) -> Optional[Dict]:
+        """Have Canvas fetch a file from the published site instead of uploading it from here.
 
-        all_items = []
-        response = requests.get(url, headers=self.headers, params=params)
+        Returns None when the site doesn't serve the same file yet (e.g. Pages is
+        still deploying this commit) or Canvas couldn't fetch it, so the caller
+        can fall back to a direct upload.
+        """
+        filename = os.path.basename(filepath)
+        source = self.published_url(filepath)
+        size = os.path.getsize(filepath)
+
+        # A separate, unauthenticated session on purpose: the token must never go
+        # to the published site, and the probe isn't a Canvas request, so it
+        # shouldn't be paced, profiled or touch the response cache
+        if self.site_session is None:
+            self.site_session = requests.Session()
+        response = self.site_session.head(source, allow_redirects=True, timeout=self.transport.timeout)
+        if response.status_code != 200 or response.headers.get('Content-Length') != str(size):
+            self._print(f"{filename} isn't published at {source} yet, uploading it directly.")
+            return None
+
+        data = self._upload_params(filepath, folder_path, existing_file, overwrite=True)
+        data.update({'url': source, 'size': size})
+        response = self._post(f"{self.base_url}/api/v1/courses/{self.course_id}/files", data=data)
         response.raise_for_status()
-        items = response.json()
-        all_items.extend(items)
+        upload_data = response.json()
 
-        # Handle pagination if needed
-        while 'next' in response.links:
-            response = requests.get(response.links['next']['url'], headers=self.headers)
-            response.raise_for_status()
-            items = response.json()
-            all_items.extend(items)
+        # Step two carries no file content; Canvas answers with a Progress object to poll
+        same_host = urlsplit(upload_data['upload_url']).netloc == urlsplit(self.base_url).netloc
+        response = self.transport.request('POST', upload_data['upload_url'], data=upload_data['upload_params'],
+                                          headers=self.headers if same_host else None)
+        response.raise_for_status()
+        result = response.json()
+        progress = self.wait_for_progress(result.get('progress', result), timeout=self.progress_timeout)
+        if progress.get('workflow_state') not in ('completed', 'failed'):
+            # Timed out, but the job may have finished since the last poll
+            file_data = self._find_uploaded_file(folder_path, data['name'], size)
+            if file_data is not None:
+                return file_data
+            self._print(f"Canvas is still fetching {filename} from {source}, uploading it directly.")
+            return None
+        if progress.get('workflow_state') != 'completed':
+            self._print(f"Canvas couldn't fetch {filename} from {source} "
+                  f"({progress.get('message') or progress.get('workflow_state')}), uploading it directly.")
+            return None
+
+        file_data = self._get_json(f"{self.base_url}/api/v1/files/{progress['results']['id']}")
+        if file_data.get('size') not in (None, size):
+            self._print(f"Canvas fetched {file_data['size']} bytes of {filename} instead of {size}, uploading it directly.")
+            return None
+        self._files_cache.add(file_data, folder_path)
+        logger.debug("Canvas fetched '%s' from %s as file %s", filename, source, file_data.get('id'))
+        return file_data
+
+    def _find_uploaded_file(self, folder_path: Optional[str], name: str, size: int) -> Optional[Dict]:
+        """Look a file up fresh from Canvas by name and size, bypassing the files cache."""
+        if folder_path and self._folder_ids.get(folder_path, 0) is None:
+            self.forget_folder(folder_path)  # Missing at the snapshot, but the upload may have created it
+        folder_id = self.get_folder_id(folder_path) if folder_path else None
+        if folder_path and folder_id is None:
+            return None
+        url = (f"{self.base_url}/api/v1/folders/{folder_id}/files" if folder_path
+               else f"{self.base_url}/api/v1/courses/{self.course_id}/files")
+        for file in self._get_all_pages(url, {'per_page': 100, 'search_term': name}):
+            if (file.get('display_name') or file.get('filename')) == name and file.get('size') == size:
+                self._files_cache.add(file, folder_path)
+                return file
+        return None
+
+    def wait_for_progress(self, progress: Dict[str, Any], timeout: float = 600.0) -> Dict[str, Any]:
+        """Poll a Canvas Progress object until it completes or fails (or timeout passes)."""
+        url = progress.get('url') or f"{self.base_url}/api/v1/progress/{progress['id']}"
+        delay = self.progress_poll_interval
+        deadline = time.monotonic() + timeout
+        while progress.get('workflow_state') not in ('completed', 'failed') and time.monotonic() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 1.5, 5.0)
+            progress = self._get_json(url)
+        return progress
 
-        return all_items
+    def get_module_items(self, module_id: str) -> List:
+        """Get all items in a module."""
+        url = f"{self.base_url}/api/v1/courses/{self.course_id}/modules/{module_id}/items"
+        return self._get_all_pages(url, {'per_page': 100})  # Get more items per page
+
+    def get_module_item_index(self, module_id: str) -> ModuleItemIndex:
+        """Return the item index for a module, listing its items on first use."""
+        key = str(module_id)
+        if key not in self._module_items:
+            self._module_items[key] = ModuleItemIndex(self.get_module_items(module_id))
+        return self._module_items[key]
+
+    def invalidate_module_items(self, module_id: Optional[str] = None) -> None:
+        """Drop the cached item index for one module, or for all modules."""
+        if module_id is None:
+            self._module_items.clear()
+        else:
+            self._module_items.pop(str(module_id), None)
 
     def item_exists_in_module(self, module_id: str, title: str) -> bool:
         """Check if an item with the given title already exists in the module.
 
-        For lecture materials, also checks for similar titles to prevent duplicates.
+        For lecture materials, also checks for items with the same lecture number
+        and material type to prevent duplicates.
         """
-        items = self.get_module_items(module_id)
-
-        # Debug for Lecture 6
-        if "Lecture 6" in title:
-            print(f"\n==== CHECKING IF ITEM EXISTS: '{title}' ====")
-            print(f"Module ID: {module_id}")
-            print(f"Found {len(items)} items in module")
-            for item in items:
-                print(f"  - Item: '{item['title']}'")
-
-        # Exact title match
-        if any(item['title'] == title for item in items):
-            if "Lecture 6" in title:
-                print(f"EXACT MATCH FOUND for '{title}'")
-            return True
+        index = self.get_module_item_index(module_id)
 
-        # For lecture materials, do additional checks to prevent duplicates
-        if title.startswith("Lecture ") and (" - Slides" in title or " - Notes" in title):
-            # Extract lecture number
-            try:
-                lecture_num = int(title.split("Lecture ")[1].split(" -")[0])
-                material_type = "Slides" if "- Slides" in title else "Notes"
-
-                # Check for any item with the same lecture number and material type
-                for item in items:
-                    item_title = item['title']
-                    if item_title.startswith(f"Lecture {lecture_num}") and f"- {material_type}" in item_title:
-                        print(f"Found similar item: '{item_title}' that matches '{title}'")
-                        if "Lecture 6" in title:
-                            print(f"SIMILAR MATCH FOUND for '{title}' -> '{item_title}'")
-                        return True
-            except (ValueError, IndexError):
-                # If we can't parse the lecture number, fall back to exact match only
-                if "Lecture 6" in title:
-                    print(f"ERROR parsing lecture number for '{title}'")
-                pass
+        item = index.find(title)
+        if item is None:
+            logger.debug("No item matching '%s' among %d items in module %s", title, len(index.items), module_id)
+            return False
 
-        if "Lecture 6" in title:
-            print(f"NO MATCH FOUND for '{title}'")
-
-        return False
+        if item['title'] != title:
+            self._print(f"Found similar item: '{item['title']}' that matches '{title}'")
+        else:
+            logger.debug("Exact item match for '%s' in module %s", title, module_id)
+        return True
 
     def create_module_item(self, module_id: str, title: str, file_id: Optional[str] = None,
                          external_url: Optional[str] = None, position: Optional[int] = None) -> Dict:
         """Create a module item in Canvas if it doesn't already exist."""
-        is_lecture6 = "Lecture 6" in title
-        if is_lecture6:
-            print(f"\n==== CREATING MODULE ITEM: '{title}' ====")
-            print(f"Module ID: {module_id}")
-            print(f"File ID: {file_id}")
-            print(f"Position: {position}")
+        logger.debug("Creating module item '%s' in module %s (file %s, position %s)",
+                     title, module_id, file_id, position)
 
         # Check if item already exists
         if self.item_exists_in_module(module_id, title):
-            print(f"Module item '{title}' already exists, skipping creation.")
-            # Return a dummy dict to maintain compatibility
-            return {"id": "existing", "title": title}
-
-        if is_lecture6:
-            print(f"No existing item found, creating new module item for '{title}'")
+            self._print(f"Module item '{title}' already exists, skipping creation.")
+            return self.get_module_item_index(module_id).find(title)
 
         url = f"{self.base_url}/api/v1/courses/{self.course_id}/modules/{module_id}/items"
 
@@ -333,291 +1534,524 @@ class CanvasIntegrator:
         if position is not None:
             data['module_item[position]'] = position
 
-        if is_lecture6:
-            print(f"Sending request with data: {data}")
-
-        response = requests.post(url, headers=self.headers, data=data)
+        response = self._post(url, data=data)
         response.raise_for_status()
         result = response.json()
-
-        if is_lecture6:
-            print(f"Created module item with ID: {result.get('id')}")
-
+        self.get_module_item_index(module_id).add(result)
+        logger.debug("Created module item '%s' with id %s", title, result.get('id'))
         return result
 
+    def move_module_item(self, module_id: str, item: Dict, position: int) -> Dict:
+        """Move an existing module item to a new position."""
+        self._print(f"Moving '{item['title']}' to position {position}")
+        url = f"{self.base_url}/api/v1/courses/{self.course_id}/modules/{module_id}/items/{item['id']}"
+        response = self._put(url, data={'module_item[position]': position})
+        response.raise_for_status()
+        item.update(response.json())
+        return item
+
     def delete_module(self, module_id: str, module_name: str) -> None:
         """Delete a module from Canvas if it's one we manage."""
         # List of modules we manage automatically
         managed_modules = ["Lecture Materials", "Discussion Activities", "Review Sessions"]
 
         if module_name in managed_modules:
-            print(f"Deleting module: {module_name}...")
+            self._print(f"Deleting module: {module_name}...")
             url = f"{self.base_url}/api/v1/courses/{self.course_id}/modules/{module_id}"
-            response = requests.delete(url, headers=self.headers)
+            response = self._delete(url)
             response.raise_for_status()
+            self.invalidate_module_items(module_id)
+            self._modules.pop(module_name, None)
+            if self.manifest is not None:
+                self.manifest.forget_module(module_id)
         else:
-            print(f"Skipping deletion of manually managed module: {module_name}")
+            self._print(f"Skipping deletion of manually managed module: {module_name}")
 
     def delete_managed_modules(self) -> None:
         """Delete only the modules that we manage automatically."""
         url = f"{self.base_url}/api/v1/courses/{self.course_id}/modules"
-        response = requests.get(url, headers=self.headers)
+        response = self._get(url)
         response.raise_for_status()
 
         for module in response.json():
             self.delete_module(module['id'], module['name'])
 
-    def sync_materials(self):
-        """Sync all course materials to Canvas."""
-        print("Starting Canvas sync...")
-
-        # Pre-load existing files to avoid duplicate uploads
-        print("Loading existing files from Canvas...")
-        self.get_files_in_folder("lecture_slides")
-        self.get_files_in_folder("lecture_notes")
-        self.get_files_in_folder("course_materials")
-        self.get_files_in_folder("review_session")
+    def forget_deleted_modules(self) -> List[str]:
+        """Drop manifest modules that no longer exist in Canvas, so their files are synced again.
 
-        # Get existing modules instead of deleting them
-        url = f"{self.base_url}/api/v1/courses/{self.course_id}/modules"
-        response = requests.get(url, headers=self.headers)
-        response.raise_for_status()
-        existing_modules = {module['name']: module for module in response.json()}
-
-        # Course Information Module (position 1, manually managed)
-        course_info = existing_modules.get("Course Information") or self.get_or_create_module("Course Information", position=1)
-        print("Found/Created Course Information module")
-
-        # Upload syllabus if it exists
-        syllabus_path = Path("course_materials/syllabus.pdf")
-        if syllabus_path.exists():
+        Returns the names of the modules that were forgotten.
+        """
+        live = {str(module['id']) for module in self.list_modules()}
+        deleted = [name for name, module_id in self.manifest.modules.items() if str(module_id) not in live]
+        for name in deleted:
+            module_id = self.manifest.modules[name]
+            self._print(f"Module '{name}' no longer exists in Canvas; its files will be synced again")
+            if name in self._modules and str(self._modules[name]['id']) == str(module_id):
+                del self._modules[name]
+            self.invalidate_module_items(module_id)
+            self.manifest.forget_module(module_id)
+        return deleted
+
+    def load_snapshot(self, materials: List[Tuple[Path, Material]]) -> int:
+        """Load the remote state these materials are compared against, in one bulk pass.
+
+        Lists the course's modules (unless the manifest already knows every one
+        needed), then each needed module's items and each upload folder's files
+        concurrently. Everything lands in the integrator's caches, which later
+        lookups and the plan executor read without further requests. Returns
+        the number of requests made.
+        """
+        before = self.transport.requests_sent
+        module_names = {material.module_name for _, material in materials}
+        folders = {material.folder_path for _, material in materials if material.folder_path}
+
+        known = {name for name in module_names
+                 if name in self._modules or (self.manifest is not None and name in self.manifest.modules)}
+        if known != module_names:
+            self.list_modules()
+        if self.manifest is not None:
+            for name in module_names:
+                if name not in self._modules and name in self.manifest.modules:
+                    self._modules[name] = {'id': self.manifest.modules[name], 'name': name}
+
+        def load_items(name: str) -> Optional[str]:
             try:
-                print("Uploading syllabus...")
-                file_data = self.upload_file(str(syllabus_path), "course_materials")
-                # Only create the item if it doesn't already exist
-                if not self.item_exists_in_module(course_info['id'], "Course Syllabus"):
-                    self.create_module_item(
-                        course_info['id'],
-                        "Course Syllabus",
-                        file_id=file_data['id'],
-                        position=1
-                    )
+                self.get_module_item_index(self._modules[name]['id'])
+            except requests.exceptions.HTTPError as e:
+                if e.response is None or e.response.status_code != 404:
+                    raise
+                return name  # Module id remembered from an earlier run no longer exists
+            return None
+
+        present = [name for name in module_names if name in self._modules]
+        workers = max(1, min(self.page_prefetch, len(present) + len(folders)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            folder_jobs = [executor.submit(self.get_files_in_folder, folder)
+                           for folder in folders if not self._files_cache.is_loaded(folder)]
+            stale = [name for name in executor.map(load_items, present) if name]
+            for job in folder_jobs:
+                job.result()
+
+        if stale:
+            for name in stale:
+                module = self._modules.pop(name)
+                self.invalidate_module_items(module['id'])
+                if self.manifest is not None:
+                    self.manifest.forget_module(module['id'])
+            self.list_modules()
+            for name in stale:
+                if name in self._modules:
+                    self.get_module_item_index(self._modules[name]['id'])
+
+        return self.transport.requests_sent - before
+
+    def plan_sync(self, materials: List[Tuple[Path, Material]]) -> SyncPlan:
+        """Diff local materials against the loaded snapshot without making any requests."""
+        # By URL: HEAD probe of the site, upload init, upload POST, at least one progress poll, file fetch
+        plan = SyncPlan(requests_per_upload=5 if self.upload_source else 2)
+        for path, material in materials:
+            module = self._modules.get(material.module_name)
+            if module is None and (material.module_name, material.module_position) not in plan.new_modules:
+                plan.new_modules.append((material.module_name, material.module_position))
+            index = self._module_items.get(str(module['id'])) if module else None
+
+            planned = PlannedFile(path, material, item=index.find(material.title) if index else None)
+            if planned.item is not None and planned.item['title'] != material.title:
+                self._print(f"Found similar item: '{planned.item['title']}' that matches '{material.title}'")
+            if material.folder_path:
+                planned.existing_file = self.get_file_by_name(path.name, material.folder_path)
+                if planned.existing_file is None:
+                    planned.upload = "new"
+                elif self._content_changed(str(path), planned.existing_file):
+                    planned.upload = "replace"
+            plan.files.append(planned)
+
+        plan.moves = self._plan_moves(plan.files)
+        return plan
+
+    @staticmethod
+    def _plan_moves(files: List[PlannedFile]) -> List[Tuple[str, Dict, int]]:
+        """Moves that put existing items back in the order of their intended positions.
+
+        Only relative order is checked, since Canvas renumbers positions densely:
+        the positions the items already hold are handed out again in the intended
+        order, which leaves items the sync doesn't manage where they are.
+        """
+        moves = []
+        by_module = {}
+        for planned in files:
+            if planned.item is not None and planned.item.get('position') is not None:
+                by_module.setdefault(planned.material.module_name, []).append(planned)
+        for name, planned_items in by_module.items():
+            slots = sorted(int(planned.item['position']) for planned in planned_items)
+            wanted = sorted(planned_items, key=lambda planned: planned.material.position)
+            for slot, planned in zip(slots, wanted):
+                if int(planned.item['position']) != slot:
+                    moves.append((name, planned.item, slot))
+        return moves
+
+    def execute_plan(self, plan: SyncPlan, jobs: int = 1) -> None:
+        """Carry out a SyncPlan.
+
+        Modules are created first, then uploads run (concurrently with jobs > 1),
+        then out-of-order items are moved, and finally module items are created
+        one at a time, grouped by module and in ascending position order so
+        odd/even slide and note positions stay deterministic.
+        """
+        for name, position in plan.new_modules:
+            self._print(f"Creating {name} module")
+            self.create_module(name, position)
+
+        def upload(planned: PlannedFile) -> Dict:
+            with self._material_timer(planned.material):
+                return self._send_file(str(planned.path), planned.material.folder_path, planned.existing_file)
+
+        uploads = plan.uploads
+        file_data = {}
+        if uploads:
+            self._print(f"Uploading {len(uploads)} files" + (f" with {jobs} workers..." if jobs > 1 else "..."))
+            with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+                futures = {executor.submit(upload, planned): planned for planned in uploads}
+                for future, planned in futures.items():
+                    try:
+                        file_data[planned.path] = future.result()
+                        self._print(f"Uploaded {planned.path.name}")
+                    except Exception as e:
+                        plan.errors.append(f"{planned.path.name}: {e}")
+                        self._print(f"Error processing {planned.path.name}: {e}")
+
+        # Moves target the positions read for the snapshot, so they have to run
+        # before new items are inserted and Canvas renumbers everything after them
+        for name, item, position in plan.moves:
+            try:
+                self.move_module_item(self._modules[name]['id'], item, position)
             except Exception as e:
-                print(f"Error uploading syllabus: {e}")
-
-        # Lecture Materials Module (position 2)
-        lecture_materials = existing_modules.get("Lecture Materials") or self.get_or_create_module("Lecture Materials", position=2)
-        print("Found/Created Lecture Materials module")
-
-        # Discussion Activities Module (position 3)
-        discussion_activities = existing_modules.get("Discussion Activities") or self.get_or_create_module("Discussion Activities", position=3)
-        print("Found/Created Discussion Activities module")
-
-        # Review Session Module (position 4)
-        review_sessions = existing_modules.get("Review Sessions") or self.get_or_create_module("Review Sessions", position=4)
-        print("Found/Created Review Sessions module")
-
-        # Track processed lecture numbers to prevent duplicates
-        processed_lecture_slides = set()
-        processed_lecture_notes = set()
-
-        # Get all existing module items to check for duplicates
-        lecture_materials_items = self.get_module_items(lecture_materials['id'])
-        print(f"\n==== CHECKING EXISTING MODULE ITEMS ====")
-        print(f"Found {len(lecture_materials_items)} items in Lecture Materials module")
-
-        # Track which lecture materials already exist in Canvas
-        lecture_slides_in_canvas = set()
-        lecture_notes_in_canvas = set()
-
-        for item in lecture_materials_items:
-            if " - Slides" in item['title'] and item['title'].startswith("Lecture "):
-                try:
-                    lecture_num = int(item['title'].split("Lecture ")[1].split(" -")[0])
-                    lecture_slides_in_canvas.add(lecture_num)
-                    print(f"Found existing slides for Lecture {lecture_num}")
-                except (ValueError, IndexError):
-                    pass
-            elif " - Notes" in item['title'] and item['title'].startswith("Lecture "):
-                try:
-                    lecture_num = int(item['title'].split("Lecture ")[1].split(" -")[0])
-                    lecture_notes_in_canvas.add(lecture_num)
-                    print(f"Found existing notes for Lecture {lecture_num}")
-                except (ValueError, IndexError):
-                    pass
-
-        # Add existing lectures to processed sets to prevent duplicates
-        processed_lecture_slides.update(lecture_slides_in_canvas)
-        processed_lecture_notes.update(lecture_notes_in_canvas)
-
-        print(f"Lectures with slides already in Canvas: {sorted(lecture_slides_in_canvas)}")
-        print(f"Lectures with notes already in Canvas: {sorted(lecture_notes_in_canvas)}")
-
-        # Upload and organize lecture slides
-        slides_dir = Path("lecture_slides")
-        if slides_dir.exists():
-            print("\n==== PROCESSING LECTURE SLIDES ====")
-            print(f"Files in directory: {[f.name for f in slides_dir.glob('*.pdf')]}")
-
-            for slide in sorted(slides_dir.glob("*.pdf")):
-                try:
-                    is_lecture6 = "Lecture6" in slide.name
-                    print(f"\nProcessing {slide.name}...")
-                    # Extract lecture number from "Lecture1_updated.pdf" format
-                    lecture_num = int(''.join(filter(str.isdigit, slide.stem.split('_')[0])))
-
-                    if is_lecture6:
-                        print(f"LECTURE 6 SLIDES DETECTED: {slide.name}")
-                        print(f"Extracted lecture number: {lecture_num}")
-                        print(f"Already processed slides: {processed_lecture_slides}")
-
-                    # Special handling for Lecture 6 - check if it's already in our processed set
-                    if lecture_num == 6:
-                        if 6 in lecture_slides_in_canvas:
-                            print(f"SPECIAL HANDLING: Skipping Lecture 6 slides as they already exist in Canvas")
-                            continue
-                        else:
-                            print(f"SPECIAL HANDLING: Adding Lecture 6 slides as they don't exist in Canvas")
-
-                    # Skip if we've already processed this lecture number
-                    if lecture_num in processed_lecture_slides:
-                        print(f"Skipping duplicate slide for Lecture {lecture_num}")
-                        continue
-
-                    if is_lecture6:
-                        print(f"Proceeding with upload for Lecture 6 slides")
-
-                    file_data = self.upload_file(str(slide), "lecture_slides")
-                    item_title = f"Lecture {lecture_num} - Slides"
-
-                    if is_lecture6:
-                        print(f"Creating module item with title: '{item_title}'")
-                        print(f"File data ID: {file_data['id']}")
-
-                    self.create_module_item(
-                        lecture_materials['id'],
-                        item_title,
-                        file_id=file_data['id'],
-                        position=lecture_num * 2 - 1  # Odd positions for slides
-                    )
-
-                    # Mark this lecture number as processed
-                    processed_lecture_slides.add(lecture_num)
-                    if is_lecture6:
-                        print(f"Added lecture number {lecture_num} to processed_lecture_slides")
-                        print(f"Updated processed slides: {processed_lecture_slides}")
-                except Exception as e:
-                    print(f"Error processing {slide.name}: {e}")
-
-        # Upload and organize lecture notes
-        notes_dir = Path("lecture_notes")
-        if notes_dir.exists():
-            for note in sorted(notes_dir.glob("*.pdf")):
-                try:
-                    print(f"Processing {note.name}...")
-                    # Extract lecture number from "Econ 2 Lecture 1 S25.pdf" format
-                    parts = note.stem.split()
-                    lecture_num = int(parts[parts.index("Lecture") + 1])
-
-                    is_lecture6 = lecture_num == 6
-                    if is_lecture6:
-                        print(f"LECTURE 6 NOTES DETECTED: {note.name}")
-                        print(f"Extracted lecture number: {lecture_num}")
-                        print(f"Already processed notes: {processed_lecture_notes}")
-
-                    # Special handling for Lecture 6 - check if it's already in our processed set
-                    if lecture_num == 6:
-                        if 6 in lecture_notes_in_canvas:
-                            print(f"SPECIAL HANDLING: Skipping Lecture 6 notes as they already exist in Canvas")
-                            continue
-                        else:
-                            print(f"SPECIAL HANDLING: Adding Lecture 6 notes as they don't exist in Canvas")
-
-                    # Skip if we've already processed this lecture number
-                    if lecture_num in processed_lecture_notes:
-                        print(f"Skipping duplicate note for Lecture {lecture_num}")
-                        continue
-
-                    file_data = self.upload_file(str(note), "lecture_notes")
-                    item_title = f"Lecture {lecture_num} - Notes"
-
-                    self.create_module_item(
-                        lecture_materials['id'],
-                        item_title,
-                        file_id=file_data['id'],
-                        position=lecture_num * 2  # Even positions for notes
-                    )
-
-                    # Mark this lecture number as processed
-                    processed_lecture_notes.add(lecture_num)
-                except Exception as e:
-                    print(f"Error processing {note.name}: {e}")
-
-        # Upload and organize activities (excluding node_modules)
-        activities_dir = Path("activities")
-        processed_activities = set()  # Keep track of processed activity numbers
-        if activities_dir.exists():
-            for activity in sorted(activities_dir.glob("activity*/index.html")):
-                try:
-                    activity_num = int(activity.parent.name.replace('activity', ''))
-                    if activity_num not in processed_activities:  # Only process each activity number once
-                        processed_activities.add(activity_num)
-                        # Create external URL to GitHub Pages
-                        github_url = f"https://matthewdlang18.github.io/macroeconomics-course-website/activities/activity{activity_num}/index.html"
-                        item_title = f"Activity {activity_num}"
-
-                        self.create_module_item(
-                            discussion_activities['id'],
-                            item_title,
-                            external_url=github_url,
-                            position=activity_num
+                plan.errors.append(f"{item['title']}: {e}")
+                self._print(f"Error moving '{item['title']}': {e}")
+
+        ordered = sorted(plan.files, key=lambda planned: (planned.material.module_position, planned.material.position))
+        for planned in ordered:
+            if planned.upload and planned.path not in file_data:
+                continue  # Upload failed
+            material = planned.material
+            module = self._modules[material.module_name]
+            file = file_data.get(planned.path) or planned.existing_file
+            try:
+                item = planned.item
+                if item is None:
+                    with self._material_timer(material, new_file=not planned.upload):
+                        item = self.create_module_item(
+                            module['id'],
+                            material.title,
+                            file_id=file['id'] if file else None,
+                            external_url=material.url,
+                            position=material.position
                         )
-                except Exception as e:
-                    print(f"Error processing activity {activity.parent.name}: {e}")
-
-        # Upload and organize review sessions
-        review_dir = Path("review_session")
-        processed_weeks = set()  # Keep track of processed week numbers
-        if review_dir.exists():
-            for review in sorted(review_dir.glob("Week*ReviewSession.pdf")):
+                self._record_synced(planned.path, module['id'], item, file['id'] if file else None)
+            except Exception as e:
+                plan.errors.append(f"{planned.path.name}: {e}")
+                self._print(f"Error processing {planned.path.name}: {e}")
+
+    @contextmanager
+    def _material_timer(self, material: Material, new_file: bool = True):
+        """Count the time spent in the block towards the profiler's per-material totals."""
+        profiler = self.transport.profiler
+        if profiler is None:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            profiler.record_material(material_kind(material), time.perf_counter() - started, new_file)
+
+    def _is_synced(self, path: Path) -> bool:
+        """Whether the manifest says this local file is already up to date in Canvas."""
+        return self.manifest is not None and self.manifest.is_current(path)
+
+    def _record_synced(self, path: Path, module_id: Any, item: Optional[Dict],
+                       file_id: Optional[Any] = None) -> None:
+        """Remember a synced file's Canvas ids in the manifest."""
+        if self.manifest is None or not item:
+            return
+        self.manifest.record(path, module_id, item.get('id'), file_id or item.get('content_id'))
+
+    def publish_file(self, path: Union[str, Path]) -> Optional[Dict]:
+        """Upload a single changed file and create its module item if needed.
+
+        Meant for a long-lived integrator (see --watch): folder listings, module
+        item indexes and the manifest stay warm between calls, so publishing one
+        edited PDF costs one upload round trip. Returns the module item, or None
+        if the file isn't course material or is unchanged.
+        """
+        path = Path(path)
+        material = classify_material(path)
+        if material is None:
+            return None
+        if self._is_synced(path):
+            self._print(f"{path.name} is unchanged since last sync, nothing to publish.")
+            return None
+
+        self._print(f"Publishing {path.name}...")
+        with self._publish_lock:
+            module = self.get_or_create_module(material.module_name, position=material.module_position)
+        file_data = self.upload_file(str(path), material.folder_path) if material.folder_path else None
+        file_id = file_data['id'] if file_data else None
+        with self._publish_lock:
+            item = self.create_module_item(
+                module['id'],
+                material.title,
+                file_id=file_id,
+                external_url=material.url,
+                position=material.position
+            )
+            self._record_synced(path, module['id'], item, file_id)
+            if self.manifest is not None:
+                self.manifest.save()
+        return item
+
+    def sync_materials(self, jobs: int = 1, dry_run: bool = False, scan: Optional[LocalScan] = None) -> SyncPlan:
+        """Sync all course materials to Canvas.
+
+        Runs in three steps: load a snapshot of the remote state the changed files
+        are compared against, diff it into a SyncPlan, then execute the plan.
+        jobs sets how many files are uploaded concurrently (1 keeps uploads
+        sequential). With dry_run the plan is printed and returned without making
+        any changes; only the snapshot's read requests are sent. When a manifest
+        is attached, files unchanged since the last sync are left out, as long as
+        the module listing shows their modules still exist.
+        scan reuses a LocalScan shared with other courses instead of scanning again.
+        """
+        self._print("Starting Canvas sync...")
+        self._phase("discover")
+        self.invalidate_module_items()
+
+        if scan is not None:
+            materials = scan.materials
+            if self.manifest is not None:
+                self.manifest.digest = scan.digest
+        else:
+            materials = discover_materials()
+        pending = [(path, material) for path, material in materials if not self._is_synced(path)]
+        snapshot_requests = 0
+        if self.manifest is not None and len(pending) < len(materials):
+            # Unchanged files are only skipped while their modules still exist
+            self._phase("snapshot")
+            before = self.transport.requests_sent
+            if self.forget_deleted_modules():
+                pending = [(path, material) for path, material in materials if not self._is_synced(path)]
+            snapshot_requests = self.transport.requests_sent - before
+        if self.manifest is not None:
+            self._print(f"{len(materials) - len(pending)} of {len(materials)} files unchanged since last sync")
+
+        plan = SyncPlan()
+        if pending:
+            self._phase("snapshot")
+            snapshot_requests += self.load_snapshot(pending)
+            # The snapshot forgets modules that turn out to be gone, along with
+            # the manifest entries of files in them; those files need syncing too
+            repending = [(path, material) for path, material in materials if not self._is_synced(path)]
+            if len(repending) > len(pending):
+                pending = repending
+                snapshot_requests += self.load_snapshot(pending)
+            self._phase("plan")
+            plan = self.plan_sync(pending)
+            plan.snapshot_requests = snapshot_requests
+
+        self._print("\n==== SYNC PLAN ====")
+        self._print(plan.describe())
+
+        if not dry_run:
+            self._phase("execute")
+            self.execute_plan(plan, jobs=jobs)
+            if self.manifest is not None:
+                self.manifest.save()
+        self._phase(None)
+        return plan
+
+def watch_materials(canvas: CanvasIntegrator, quiet_window: float = 2.0, workers: int = 1) -> None:
+    """Publish lecture slides, notes and review PDFs to Canvas as they change, until interrupted."""
+    # watchdog is only needed for watch mode, so don't require it for plain syncs
+    from sync_lecture_materials import CanvasPublishHandler, SyncDaemon
+
+    watchers = [CanvasPublishHandler(folder, canvas)
+                for folder in ("lecture_slides", "lecture_notes", "review_session") if Path(folder).is_dir()]
+    print("\n==== WATCHING FOR CHANGES (Ctrl+C to stop) ====")
+    SyncDaemon([], quiet_window=quiet_window, workers=max(1, workers), watchers=watchers).run()
+
+def describe_error(error: Exception) -> str:
+    """A one-line description of an error for a report row."""
+    if isinstance(error, requests.exceptions.RequestException):
+        return str(error)
+    return f"{type(error).__name__}: {error}"
+
+def sync_courses(api_token: str, course_ids: List[str], base_url: str = "https://ucsb.instructure.com",
+                 jobs: int = 1, dry_run: bool = False, full_reconcile: bool = False,
+                 transport_factory: Optional[Callable[[str], CanvasTransport]] = None,
+                 show_progress: bool = False,
+                 upload_source: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Sync the same local materials to several courses at once.
+
+    The local tree is scanned and hashed once; each course then syncs on its own
+    thread with its own integrator, manifest, connection pool and rate-limit
+    governor, so the whole run takes about as long as the slowest course.
+    Returns one result dict per course, in the order given.
+    """
+    scan = LocalScan()
+    transport_factory = transport_factory or (lambda course_id: CanvasTransport(
+        pool_size=max(10, jobs),
+        cache=ResponseCache.load(Path(SYNC_STATE_DIR) / f"http-cache-{course_id}.json")))
+
+    def sync_course(course_id: str) -> Dict[str, Any]:
+        result = {'course_id': course_id, 'plan': None, 'error': None, 'requests': 0}
+        prefix = f"[{course_id}] "  # Courses print concurrently, so tag every line with its course
+        started = time.perf_counter()
+        transport = None
+        # Anything one course raises is reported in its row, so it can't
+        # take the other courses' results down with it
+        try:
+            manifest = SyncManifest.load(Path(SYNC_STATE_DIR) / f"manifest-{course_id}.json", course_id)
+            if full_reconcile:
+                manifest.reset()
+            transport = transport_factory(course_id)
+            transport.log_prefix = prefix
+            canvas = CanvasIntegrator(api_token, course_id, base_url=base_url,
+                                      transport=transport, manifest=manifest)
+            canvas.log_prefix = prefix
+            if show_progress:
+                canvas.upload_progress = canvas.print_upload_progress
+            canvas.upload_source = upload_source
+            result['plan'] = canvas.sync_materials(jobs=jobs, dry_run=dry_run, scan=scan)
+        except Exception as e:
+            logger.debug("Sync of course %s failed", course_id, exc_info=True)
+            result['error'] = describe_error(e)
+            print(f"{prefix}Sync failed: {result['error']}")
+        finally:
+            if transport is not None:
                 try:
-                    print(f"Processing {review.name}...")
-                    # Extract week number from "Week1ReviewSession.pdf" format
-                    week_num = int(''.join(filter(str.isdigit, review.stem.split('Week')[1].split('Review')[0])))
-                    if week_num not in processed_weeks and week_num != 5:  # Skip week 5 and duplicates
-                        processed_weeks.add(week_num)
-                        file_data = self.upload_file(str(review), "review_session")
-                        item_title = f"Week {week_num} Review Questions"
-
-                        self.create_module_item(
-                            review_sessions['id'],
-                            item_title,
-                            file_id=file_data['id'],
-                            position=week_num
-                        )
+                    transport.close()
                 except Exception as e:
-                    print(f"Error processing {review.name}: {e}")
+                    result['error'] = result['error'] or f"saving HTTP cache: {describe_error(e)}"
+                result['requests'] = transport.requests_sent
+        result['seconds'] = time.perf_counter() - started
+        return result
+
+    with ThreadPoolExecutor(max_workers=len(course_ids)) as executor:
+        return list(executor.map(sync_course, course_ids))
+
+def format_course_report(results: List[Dict[str, Any]], elapsed: float) -> str:
+    """One table summarizing a multi-course sync."""
+    lines = [f"{'course':<12} {'uploads':>7} {'items':>6} {'moves':>6} {'requests':>9} {'seconds':>8}  status"]
+    for result in results:
+        plan = result['plan']
+        if result['error']:
+            status = f"failed: {result['error']}"
+        elif plan.errors:
+            status = f"{len(plan.errors)} errors: " + "; ".join(plan.errors)
+        else:
+            status = "ok"
+        uploads, items, moves = (len(plan.uploads), len(plan.new_items), len(plan.moves)) if plan else ('-', '-', '-')
+        lines.append(f"{result['course_id']:<12} {uploads:>7} {items:>6} {moves:>6} "
+                     f"{result['requests']:>9} {result['seconds']:>8.2f}  {status}")
+    total = sum(result['seconds'] for result in results)
+    lines.append(f"{len(results)} courses in {elapsed:.2f}s ({total:.2f}s if run one after another)")
+    return "\n".join(lines)
 
 def main():
+    parser = argparse.ArgumentParser(description="Sync course materials to Canvas.")
+    parser.add_argument('--courses', nargs='+', default=None, metavar='COURSE_ID',
+                        help="sync to these courses in parallel (default: CANVAS_COURSE_ID, "
+                             "which may also be a comma-separated list)")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="number of files to upload concurrently (default: 1)")
+    parser.add_argument('--manifest', default=None,
+                        help=f"sync manifest path (default: {SYNC_STATE_DIR}/manifest-<course id>.json)")
+    parser.add_argument('--full-reconcile', action='store_true',
+                        help="ignore the manifest and rebuild it from Canvas")
+    parser.add_argument('--profile', nargs='?', const=f"{SYNC_STATE_DIR}/profile.json", default=None,
+                        metavar='PATH', help="record every API call and write a JSON summary (default: %(const)s)")
+    parser.add_argument('--profile-top', type=int, default=10,
+                        help="number of slowest calls to report with --profile (default: 10)")
+    parser.add_argument('--progress', action='store_true', help="print upload progress and throughput")
+    parser.add_argument('--no-http-cache', action='store_true',
+                        help=f"don't cache or revalidate GET responses in {SYNC_STATE_DIR}/http-cache-<course id>.json")
+    parser.add_argument('--upload-from-url', nargs='?', const=PAGES_URL, default=None, metavar='SITE',
+                        help="have Canvas fetch files from the published site instead of uploading them "
+                             "from here (default: %(const)s)")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="print the sync plan and its expected request count without changing Canvas")
+    parser.add_argument('--watch', action='store_true',
+                        help="after syncing, keep running and publish each changed PDF as it is saved")
+    parser.add_argument('--quiet-window', type=float, default=2.0,
+                        help="with --watch, seconds a file must be left alone before it is published (default: 2.0)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="print debug output")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING, format="%(message)s")
+
     api_token = os.environ.get('CANVAS_API_TOKEN')
-    course_id = os.environ.get('CANVAS_COURSE_ID')
+    course_ids = args.courses or [course.strip() for course in os.environ.get('CANVAS_COURSE_ID', '').split(',')
+                                  if course.strip()]
 
-    if not api_token or not course_id:
+    if not api_token or not course_ids:
         print("Please set CANVAS_API_TOKEN and CANVAS_COURSE_ID environment variables")
         return
 
-    canvas = CanvasIntegrator(api_token, course_id)
+    jobs = max(1, args.jobs)
+    if len(course_ids) > 1:
+        if args.watch or args.manifest or args.profile:
+            parser.error("--watch, --manifest and --profile work with a single course only")
+        print(f"\n==== STARTING CANVAS SYNC FOR {len(course_ids)} COURSES ====")
+        print(f"Time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        started = time.perf_counter()
+        transport_factory = None
+        if args.no_http_cache:
+            transport_factory = lambda course_id: CanvasTransport(pool_size=max(10, jobs))
+        results = sync_courses(api_token, course_ids, jobs=jobs, dry_run=args.dry_run,
+                               full_reconcile=args.full_reconcile, transport_factory=transport_factory,
+                               show_progress=args.progress,
+                               upload_source=args.upload_from_url)
+        print("\n==== MULTI-COURSE SYNC REPORT ====")
+        print(format_course_report(results, time.perf_counter() - started))
+        return
+
+    course_id = course_ids[0]
+    manifest = SyncManifest.load(args.manifest or Path(SYNC_STATE_DIR) / f"manifest-{course_id}.json", course_id)
+    if args.full_reconcile:
+        print("Full reconcile requested, rebuilding sync manifest from Canvas")
+        manifest.reset()
+    profiler = SyncProfiler() if args.profile else None
+    cache = None
+    if not args.no_http_cache:
+        cache = ResponseCache.load(Path(SYNC_STATE_DIR) / f"http-cache-{course_id}.json")
+    canvas = CanvasIntegrator(api_token, course_id,
+                              transport=CanvasTransport(pool_size=max(10, jobs), profiler=profiler, cache=cache),
+                              manifest=manifest)
+    if args.progress:
+        canvas.upload_progress = canvas.print_upload_progress
+    canvas.upload_source = args.upload_from_url
 
     try:
         print("\n==== STARTING CANVAS SYNC ====")
         print(f"Time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-        canvas.sync_materials()
+        canvas.sync_materials(jobs=jobs, dry_run=args.dry_run)
+        if args.dry_run:
+            return
         print("\n==== SYNC COMPLETED SUCCESSFULLY ====")
         print(f"Time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
 
+        if args.watch:
+            watch_materials(canvas, quiet_window=args.quiet_window, workers=jobs)
+
     except requests.exceptions.RequestException as e:
         print(f"\n==== ERROR DURING SYNC ====")
         print(f"Error occurred: {e}")
+    finally:
+        canvas.transport.close()
+        if profiler is not None:
+            profiler.write(args.profile, args.profile_top)
+            print(f"\n==== PROFILE ({args.profile}) ====")
+            print(profiler.report(args.profile_top))
 
 if __name__ == "__main__":
     main()
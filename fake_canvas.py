@@ -0,0 +1,405 @@
+"""In-memory stand-in for the parts of the Canvas API that canvas_integration.py uses.
+
+FakeCanvas implements modules, module items (including moves), course and folder file listings
+(with Link pagination), folder lookup by path, the two-step upload_url flow and
+URL uploads, where it fetches the file itself and reports through a Progress
+object (serve_site() stands in for the published site to fetch from).
+It can add per-request latency and emulate Canvas's leaky-bucket rate limit
+(X-Rate-Limit-Remaining / X-Request-Cost headers, 403 when exhausted). GET
+responses carry an ETag and are answered with 304 when If-None-Match matches.
+
+Use it either as a requests transport adapter:
+
+    fake = FakeCanvas(latency=0.02)
+    transport = CanvasTransport(session=fake.session())
+    canvas = CanvasIntegrator("token", "1", base_url=fake.base_url, transport=transport)
+
+or as a local HTTP server with serve().
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.models import Response
+
+# (status, JSON body, extra headers)
+FakeResult = Tuple[int, Any, Dict[str, str]]
+
+
+def parse_multipart(content_type: str, body: bytes) -> Tuple[Dict[str, str], Optional[bytes]]:
+    """Split a multipart/form-data body into its form fields and file content."""
+    boundary = re.search(r'boundary="?([^";]+)"?', content_type).group(1).encode()
+    fields, content = {}, None
+    for part in body.split(b'--' + boundary)[1:]:
+        if part.startswith(b'--'):
+            break
+        head, _, payload = part.partition(b'\r\n\r\n')
+        payload = payload[:-2] if payload.endswith(b'\r\n') else payload
+        name = re.search(rb'name="([^"]*)"', head).group(1).decode()
+        if re.search(rb'filename="', head):
+            content = payload
+        else:
+            fields[name] = payload.decode()
+    return fields, content
+
+
+class FakeCanvas:
+    """Thread-safe in-memory Canvas course with optional latency and rate limiting."""
+
+    def __init__(self, base_url: str = "http://canvas.test", latency: float = 0.0,
+                 rate_limit: Optional[float] = None, refill_rate: float = 10.0,
+                 request_cost: float = 1.0, default_per_page: int = 10):
+        self.base_url = base_url.rstrip('/')
+        self.upload_url = f"{self.base_url}/files_api/upload"
+        self.latency = latency
+        self.rate_limit = rate_limit  # Bucket size, None disables rate limiting
+        self.refill_rate = refill_rate
+        self.request_cost = request_cost
+        self.default_per_page = default_per_page
+        self.bucket = rate_limit
+        self.bucket_updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.modules = {}  # Module id -> module
+        self.items = {}  # Module id -> list of items
+        self.folders = {'': 1}  # Folder path -> folder id ('' is "course files")
+        self.files = {}  # File id -> file
+        self.pending_uploads = {}  # Upload token -> upload params
+        self.progress = {}  # Progress id -> progress of a URL upload
+        self.url_fetches = []  # URLs fetched for URL uploads
+        self.fetch_session = requests.Session()
+        self.fetch_session.trust_env = False
+        self.requests = []  # (method, path) of every request received
+        self.throttled = 0
+        self.not_modified = 0  # 304s sent to conditional GETs
+        self._next_id = 100
+
+    # Helpers
+
+    def _id(self) -> int:
+        self._next_id += 1
+        return self._next_id
+
+    def session(self) -> requests.Session:
+        """A requests session whose calls to base_url are served by this fake."""
+        session = requests.Session()
+        session.trust_env = False  # No proxy lookups from the environment for a local fake
+        session.mount(self.base_url, FakeCanvasAdapter(self))
+        return session
+
+    def reset_counters(self) -> None:
+        with self.lock:
+            self.requests = []
+            self.throttled = 0
+            self.not_modified = 0
+
+    def _spend(self) -> Optional[float]:
+        """Charge one request against the bucket; returns the remaining quota or None when throttled."""
+        if self.rate_limit is None:
+            return None
+        now = time.monotonic()
+        self.bucket = min(self.rate_limit, self.bucket + self.refill_rate * (now - self.bucket_updated))
+        self.bucket_updated = now
+        if self.bucket < self.request_cost:
+            return -1.0
+        self.bucket -= self.request_cost
+        return self.bucket
+
+    def _page(self, results: List[Dict], query: Dict[str, List[str]], path: str) -> FakeResult:
+        per_page = min(int(query.get('per_page', [self.default_per_page])[0]), 100)
+        page = int(query.get('page', ['1'])[0])
+        last = max(1, (len(results) + per_page - 1) // per_page)
+        links = []
+        if page < last:
+            links.append(f'<{self.base_url}{path}?page={page + 1}&per_page={per_page}>; rel="next"')
+        links.append(f'<{self.base_url}{path}?page={last}&per_page={per_page}>; rel="last"')
+        return 200, results[(page - 1) * per_page:page * per_page], {'Link': ', '.join(links)}
+
+    def _folder_id(self, folder_path: str) -> int:
+        folder_path = folder_path.strip('/')
+        if folder_path not in self.folders:
+            self.folders[folder_path] = self._id()
+        return self.folders[folder_path]
+
+    def _place_item(self, module_id: int, item: Dict, position: int) -> None:
+        """Put an item at position and renumber the module's items densely, as Canvas does."""
+        items = self.items[module_id]
+        if item in items:
+            items.remove(item)
+        items.insert(max(0, min(position - 1, len(items))), item)
+        for number, other in enumerate(items, 1):
+            other['position'] = number
+
+    # Request handling
+
+    def handle(self, method: str, url: str, headers: Dict[str, str], body: bytes) -> Tuple[int, bytes, Dict[str, str]]:
+        """Serve one request and return (status, body bytes, headers)."""
+        if self.latency:
+            time.sleep(self.latency)
+        parts = urlsplit(url)
+        query = parse_qs(parts.query)
+        content_type = headers.get('Content-Type', '')
+        content = None
+        if content_type.startswith('multipart/form-data'):
+            form, content = parse_multipart(content_type, body)
+        else:
+            form = {key: values[0] for key, values in parse_qs(body.decode(errors='replace')).items()}
+
+        with self.lock:
+            self.requests.append((method, parts.path))
+            remaining = self._spend()
+            if remaining is not None and remaining < 0:
+                self.throttled += 1
+                return 403, b'403 Forbidden (Rate Limit Exceeded)', {
+                    'X-Rate-Limit-Remaining': '0.0', 'X-Request-Cost': str(self.request_cost)}
+            status, data, extra = self.route(method, unquote(parts.path), query, form, content)
+
+        response_headers = {'Content-Type': 'application/json'}
+        response_headers.update(extra)
+        if remaining is not None:
+            response_headers['X-Rate-Limit-Remaining'] = f"{remaining:.3f}"
+            response_headers['X-Request-Cost'] = str(self.request_cost)
+        content = json.dumps(data).encode()
+        if method == 'GET' and status == 200:
+            # Like Rails: a weak ETag over the body, and 304 when the client already has it
+            etag = f'W/"{hashlib.md5(content).hexdigest()}"'
+            response_headers['ETag'] = etag
+            if headers.get('If-None-Match') == etag:
+                with self.lock:
+                    self.not_modified += 1
+                return 304, b'', response_headers
+        return status, content, response_headers
+
+    def route(self, method: str, path: str, query: Dict[str, List[str]],
+              form: Dict[str, str], content: Optional[bytes]) -> FakeResult:
+        course = r'/api/v1/courses/[^/]+'
+
+        if re.fullmatch(course + r'/modules', path):
+            if method == 'GET':
+                return self._page(list(self.modules.values()), query, path)
+            module = {'id': self._id(), 'name': form['module[name]'],
+                      'position': int(form.get('module[position]', len(self.modules) + 1))}
+            self.modules[module['id']] = module
+            self.items[module['id']] = []
+            return 200, module, {}
+
+        match = re.fullmatch(course + r'/modules/(\d+)', path)
+        if match and method == 'DELETE':
+            module = self.modules.pop(int(match.group(1)), None)
+            self.items.pop(int(match.group(1)), None)
+            return (200, module, {}) if module else (404, {'errors': 'not found'}, {})
+
+        match = re.fullmatch(course + r'/modules/(\d+)/items', path)
+        if match:
+            module_id = int(match.group(1))
+            if module_id not in self.items:
+                return 404, {'errors': 'module not found'}, {}
+            if method == 'GET':
+                return self._page(self.items[module_id], query, path)
+            item = {
+                'id': self._id(),
+                'module_id': module_id,
+                'title': form['module_item[title]'],
+                'type': form['module_item[type]'],
+            }
+            if 'module_item[content_id]' in form:
+                item['content_id'] = int(form['module_item[content_id]'])
+            if 'module_item[external_url]' in form:
+                item['external_url'] = form['module_item[external_url]']
+            self._place_item(module_id, item, int(form.get('module_item[position]', len(self.items[module_id]) + 1)))
+            return 200, item, {}
+
+        match = re.fullmatch(course + r'/modules/(\d+)/items/(\d+)', path)
+        if match and method == 'PUT':
+            item_id = int(match.group(2))
+            module_id = int(match.group(1))
+            for item in self.items.get(module_id, []):
+                if item['id'] == item_id:
+                    if 'module_item[position]' in form:
+                        self._place_item(module_id, item, int(form['module_item[position]']))
+                    if 'module_item[title]' in form:
+                        item['title'] = form['module_item[title]']
+                    return 200, item, {}
+            return 404, {'errors': 'not found'}, {}
+
+        match = re.fullmatch(course + r'/folders/by_path/(.*)', path)
+        if match and method == 'GET':
+            folder_path = match.group(1).strip('/')
+            if folder_path not in self.folders:
+                return 404, {'errors': 'not found'}, {}
+            chain, prefix = [{'id': self.folders[''], 'full_name': 'course files'}], ''
+            for segment in filter(None, folder_path.split('/')):
+                prefix = f"{prefix}/{segment}".strip('/')
+                chain.append({'id': self.folders.get(prefix), 'full_name': f"course files/{prefix}"})
+            return 200, chain, {}
+
+        match = re.fullmatch(r'/api/v1/folders/(\d+)/files', path)
+        if match and method == 'GET':
+            folder_id = int(match.group(1))
+            if folder_id not in self.folders.values():
+                return 404, {'errors': 'not found'}, {}
+            return self._page([f for f in self.files.values() if f['folder_id'] == folder_id], query, path)
+
+        if re.fullmatch(course + r'/files', path):
+            if method == 'GET':
+                term = query.get('search_term', [None])[0]
+                files = [f for f in self.files.values() if not term or term in f['filename']]
+                return self._page(files, query, path)
+            token = str(self._id())
+            self.pending_uploads[token] = dict(form)
+            return 200, {'upload_url': f"{self.upload_url}/{token}", 'upload_params': {'token': token}}, {}
+
+        match = re.fullmatch(r'/files_api/upload/(\d+)', path)
+        if match and method == 'POST':
+            params = self.pending_uploads.pop(match.group(1), None)
+            if params is not None and content is None and params.get('url'):
+                return 200, {'progress': self._start_url_upload(params)}, {}
+            if params is None or content is None:
+                return 400, {'errors': 'bad upload'}, {}
+            return 201, self._store_file(params, content), {}
+
+        match = re.fullmatch(r'/api/v1/progress/(\d+)', path)
+        if match and method == 'GET':
+            progress = self.progress.get(int(match.group(1)))
+            return (200, dict(progress), {}) if progress else (404, {'errors': 'not found'}, {})
+
+        match = re.fullmatch(r'/api/v1/files/(\d+)', path)
+        if match and method == 'GET':
+            file = self.files.get(int(match.group(1)))
+            return (200, file, {}) if file else (404, {'errors': 'not found'}, {})
+
+        return 404, {'errors': f"no route for {method} {path}"}, {}
+
+    def _start_url_upload(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """Queue a URL upload: the file is fetched on a background thread, like Canvas's job queue."""
+        progress = {'id': self._id(), 'workflow_state': 'queued', 'completion': 0,
+                    'message': None, 'results': None}
+        progress['url'] = f"{self.base_url}/api/v1/progress/{progress['id']}"
+        self.progress[progress['id']] = progress
+
+        def fetch():
+            try:
+                response = self.fetch_session.get(params['url'], timeout=30)
+                response.raise_for_status()
+                content, error = response.content, None
+            except requests.RequestException as e:
+                content, error = None, str(e)
+            with self.lock:
+                self.url_fetches.append(params['url'])
+                if content is None:
+                    progress.update(workflow_state='failed', message=error)
+                else:
+                    file = self._store_file(params, content)
+                    progress.update(workflow_state='completed', completion=100, results={'id': file['id']})
+
+        threading.Thread(target=fetch, daemon=True).start()
+        return dict(progress)
+
+    def _store_file(self, params: Dict[str, str], content: bytes) -> Dict[str, Any]:
+        """Create (or overwrite) a file from a completed upload."""
+        folder_path = (params.get('parent_folder_path') or '').strip('/')
+        folder_id = self._folder_id(folder_path)
+        name = params['name']
+        replaced = set()
+        if params.get('on_duplicate') == 'overwrite':
+            for file_id, existing in list(self.files.items()):
+                if existing['folder_id'] == folder_id and existing['display_name'] == name:
+                    del self.files[file_id]
+                    replaced.add(file_id)
+        file = {
+            'id': self._id(),
+            'folder_id': folder_id,
+            'filename': name,
+            'display_name': name,
+            'size': len(content),
+        }
+        self.files[file['id']] = file
+        # Like Canvas, module items linking the overwritten file follow it to the replacement
+        for items in self.items.values():
+            for item in items:
+                if item.get('content_id') in replaced:
+                    item['content_id'] = file['id']
+        return file
+
+    # Local HTTP server
+
+    def serve(self, host: str = '127.0.0.1', port: int = 0) -> ThreadingHTTPServer:
+        """Serve this fake over HTTP on a background thread and point base_url at it."""
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _handle(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                status, data, headers = fake.handle(self.command, self.path, dict(self.headers), body)
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        self.base_url = f"http://{host}:{server.server_address[1]}"
+        self.upload_url = f"{self.base_url}/files_api/upload"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def serve_site(root: str, host: str = '127.0.0.1', port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve a directory over HTTP on a background thread, standing in for the published GitHub Pages site.
+
+    Returns the server and its base URL.
+    """
+    class Handler(SimpleHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), partial(Handler, directory=str(root)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+class FakeCanvasAdapter(BaseAdapter):
+    """requests transport adapter that answers from a FakeCanvas instead of the network."""
+
+    def __init__(self, fake: FakeCanvas):
+        super().__init__()
+        self.fake = fake
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        body = request.body
+        if body is None:
+            body = b''
+        elif isinstance(body, str):
+            body = body.encode()
+        elif hasattr(body, 'read'):
+            body = body.read()
+        elif not isinstance(body, bytes):
+            body = b''.join(body)
+
+        status, data, headers = self.fake.handle(request.method, request.url, dict(request.headers), body)
+        response = Response()
+        response.status_code = status
+        response._content = data
+        response.headers.update(headers)
+        response.url = request.url
+        response.request = request
+        response.reason = 'OK' if status < 400 else 'Error'
+        response.encoding = 'utf-8'
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,29 @@
+// Data Assets for the real-time data pages
+// Loads the JSON files build_data_assets.py generates from the course_materials
+// workbooks, so pages no longer download and parse .xlsx files with SheetJS
+
+// Fetch course_materials/data/<name>.json (e.g. 'GDP' for GDP.xlsx)
+async function loadDataAsset(name) {
+    const response = await fetch(`course_materials/data/${name}.json`);
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    return response.json();
+}
+
+// Rebuild the rows XLSX.utils.sheet_to_json(worksheet, { raw: true }) returns:
+// one object per row, keyed by header in column order, without empty cells
+function assetRows(sheet) {
+    const rows = new Array(sheet.rows);
+    for (let r = 0; r < sheet.rows; r++) {
+        const row = {};
+        for (let c = 0; c < sheet.columns.length; c++) {
+            const value = sheet.values[c][r];
+            if (value !== null) {
+                row[sheet.columns[c]] = value;
+            }
+        }
+        rows[r] = row;
+    }
+    return rows;
+}
@@ -1,60 +1,485 @@
+import argparse
+import hashlib
+import json
 import os
 import shutil
+import signal
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+def file_hash(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def files_match(source_path, target_path):
+    """True if target_path already holds the same content as source_path.
+
+    Size and mtime are compared first (copy2/copystat preserve mtime). If only the
+    mtime differs the contents are hashed, and a match fixes up the target's mtime
+    so the next check is cheap again.
+    """
+    try:
+        source_stat = os.stat(source_path)
+        target_stat = os.stat(target_path)
+    except FileNotFoundError:
+        return False
+    if source_stat.st_size != target_stat.st_size:
+        return False
+    if abs(source_stat.st_mtime - target_stat.st_mtime) < 0.001:
+        return True
+    if file_hash(source_path) != file_hash(target_path):
+        return False
+    shutil.copystat(source_path, target_path)
+    return True
+
+def copy_atomic(source_path, target_path):
+    """Copy through a temp file in the target directory, then rename it into place.
+
+    The "~...tmp" name is one Dropbox ignores, so it only ever sees the finished file.
+    """
+    target_dir = os.path.dirname(target_path)
+    fd, tmp_path = tempfile.mkstemp(dir=target_dir, prefix='~', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp, open(source_path, 'rb') as source:
+            shutil.copyfileobj(source, tmp)
+        shutil.copystat(source_path, tmp_path)
+        os.replace(tmp_path, target_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+def is_ignored(path):
+    # Editor lock files, temp files and hidden files never get synced
+    name = os.path.basename(path)
+    return name.startswith(('.', '~')) or name.endswith(('.tmp', '.swp', '.crdownload', '.part'))
+
+def scan_files(directory):
+    """Map file name -> (size, mtime) for the regular, non-ignored files in a directory."""
+    files = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=True) and not is_ignored(entry.name):
+                    stat = entry.stat()
+                    files[entry.name] = (stat.st_size, stat.st_mtime)
+    except FileNotFoundError:
+        pass
+    return files
+
+def reconcile_dirs(source_dir, target_dir, executor, check_hash=False):
+    """Bring target_dir up to date with source_dir, copying only what differs.
+
+    Both folders are listed with os.scandir and compared by size and mtime; with
+    check_hash, files whose size matches but mtime doesn't are hashed before being
+    copied. Copies run on executor. Files only present in the target are left alone
+    and reported as extra. Returns a report dict.
+    """
+    started = time.monotonic()
+    source_files = scan_files(source_dir)
+    target_files = scan_files(target_dir)
+
+    to_copy = []
+    for name, (size, mtime) in source_files.items():
+        target = target_files.get(name)
+        if target is not None and target[0] == size and abs(target[1] - mtime) < 0.001:
+            continue
+        if (check_hash and target is not None and target[0] == size
+                and files_match(os.path.join(source_dir, name), os.path.join(target_dir, name))):
+            continue
+        to_copy.append(name)
+
+    def copy(name):
+        copy_atomic(os.path.join(source_dir, name), os.path.join(target_dir, name))
+        print(f"Synced: {name}")
+
+    errors = 0
+    for name, future in [(name, executor.submit(copy, name)) for name in to_copy]:
+        try:
+            future.result()
+        except Exception as e:
+            errors += 1
+            print(f"Error syncing {name}: {str(e)}")
+
+    return {
+        'source_dir': source_dir,
+        'scanned': len(source_files),
+        'copied': len(to_copy) - errors,
+        'unchanged': len(source_files) - len(to_copy),
+        'errors': errors,
+        'extra_in_target': sorted(set(target_files) - set(source_files)),
+        'seconds': round(time.monotonic() - started, 3),
+    }
+
+class PendingChange:
+    def __init__(self, handler, action, path, old_path, deadline, last_seen):
+        self.handler = handler
+        self.action = action  # 'sync', 'move' or 'delete'
+        self.path = path
+        self.old_path = old_path  # Source path before a move
+        self.deadline = deadline
+        self.last_seen = last_seen  # (size, mtime_ns) when last checked
+
+def stat_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+class ChangeQueue:
+    """Debounces file events per path and applies them on a small worker pool.
+
+    Events for the same path are collapsed into one pending change. A change is
+    applied once no new event has arrived for quiet_window seconds and the file's
+    size and mtime have stopped changing, so a PDF written in several bursts is
+    copied once, after it is complete. Copies run on a pool of workers so one
+    large file doesn't hold up the others.
+    """
+
+    def __init__(self, quiet_window=1.0, workers=2):
+        self.quiet_window = quiet_window
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sync-worker')
+        self.pending = {}  # Source path -> PendingChange
+        self.in_progress = set()
+        self.counters = {
+            'events': 0,  # Events received
+            'coalesced': 0,  # Events folded into an already pending change
+            'copies': 0,  # Files actually copied
+            'unchanged': 0,  # Changes that turned out to need no copy
+            'moves': 0,
+            'deletes': 0,
+        }
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='sync-debounce', daemon=True)
+        self._thread.start()
+
+    def submit(self, handler, action, path, old_path=None):
+        """Queue a change; it replaces any change still pending for the same path."""
+        with self._condition:
+            self.counters['events'] += 1
+            if action == 'move':
+                # A change pending under the old name follows the file to its new name
+                previous = self.pending.pop(old_path, None)
+                if previous is not None:
+                    self.counters['coalesced'] += 1
+                    if previous.action == 'move':
+                        old_path = previous.old_path
+            existing = self.pending.get(path)
+            if existing is not None:
+                self.counters['coalesced'] += 1
+                if action == 'delete' and existing.action == 'move':
+                    # Moved and then deleted: the target copy under the old name goes too
+                    self._add(handler, 'delete', existing.old_path, None)
+                if action == 'sync' and existing.action == 'move':
+                    action, old_path = 'move', existing.old_path
+            self._add(handler, action, path, old_path)
+            self._condition.notify_all()
+
+    def _add(self, handler, action, path, old_path):
+        last_seen = stat_signature(path) if action != 'delete' else None
+        self.pending[path] = PendingChange(handler, action, path, old_path,
+                                           time.monotonic() + self.quiet_window, last_seen)
+
+    def stats(self):
+        with self._condition:
+            stats = dict(self.counters)
+            stats['pending'] = len(self.pending) + len(self.in_progress)
+        return stats
+
+    def _run(self):
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                next_deadline = None
+                for change in list(self.pending.values()):
+                    if change.deadline > now or change.path in self.in_progress:
+                        if change.deadline > now:
+                            next_deadline = min(next_deadline or change.deadline, change.deadline)
+                        continue
+                    if change.action != 'delete':
+                        signature = stat_signature(change.path)
+                        if signature != change.last_seen:
+                            # Still being written: wait for another quiet window
+                            change.last_seen = signature
+                            change.deadline = now + self.quiet_window
+                            next_deadline = min(next_deadline or change.deadline, change.deadline)
+                            continue
+                    del self.pending[change.path]
+                    self.in_progress.add(change.path)
+                    self.pool.submit(self._apply, change)
+
+                if self._closed and not self.pending and not self.in_progress:
+                    return
+                timeout = None if next_deadline is None else max(0.0, next_deadline - now)
+                self._condition.wait(timeout if timeout is not None else 1.0)
+
+    def _apply(self, change):
+        try:
+            if change.action == 'delete':
+                change.handler.delete_file(change.path)
+                counter = 'deletes'
+            elif change.action == 'move':
+                change.handler.move_file(change.old_path, change.path)
+                counter = 'moves'
+            else:
+                counter = 'copies' if change.handler.sync_file(change.path) else 'unchanged'
+        except Exception as e:
+            print(f"Error applying {change.action} for {os.path.basename(change.path)}: {str(e)}")
+            counter = None
+        with self._condition:
+            if counter:
+                self.counters[counter] += 1
+            self.in_progress.discard(change.path)
+            self._condition.notify_all()
+
+    def close(self):
+        """Apply whatever is still pending, then stop the scheduler and workers."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self.pool.shutdown(wait=True)
+
 class SyncHandler(FileSystemEventHandler):
-    def __init__(self, source_dir, target_dir):
+    def __init__(self, source_dir, target_dir, queue=None):
         self.source_dir = source_dir
         self.target_dir = target_dir
-        
+        self.queue = queue  # ChangeQueue to debounce through; None applies events immediately
+
+    def target_for(self, source_path):
+        """Target path for a file in the source directory, or None if it's outside it."""
+        source_dir = os.path.abspath(self.source_dir)
+        source_path = os.path.abspath(source_path)
+        if os.path.dirname(source_path) != source_dir:
+            return None
+        return os.path.join(self.target_dir, os.path.basename(source_path))
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.queue_change('sync', event.src_path)
+
     def on_modified(self, event):
         if not event.is_directory:
-            self.sync_files()
+            self.queue_change('sync', event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.queue_change('move', event.dest_path, event.src_path)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self.queue_change('delete', event.src_path)
+
+    def queue_change(self, action, path, old_path=None):
+        if self.queue is not None:
+            self.queue.submit(self, action, os.path.abspath(path),
+                              os.path.abspath(old_path) if old_path else None)
+        elif action == 'move':
+            self.move_file(old_path, path)
+        elif action == 'delete':
+            self.delete_file(path)
+        else:
+            self.sync_file(path)
+
+    def sync_file(self, source_path):
+        """Copy one file to the target unless the target already matches it."""
+        target_path = self.target_for(source_path)
+        if target_path is None or is_ignored(source_path) or not os.path.isfile(source_path):
+            return False
+        item = os.path.basename(source_path)
+        try:
+            if files_match(source_path, target_path):
+                return False
+            copy_atomic(source_path, target_path)
+            print(f"Synced: {item}")
+            return True
+        except FileNotFoundError:
+            # Removed again before we got to it; the delete event cleans up
+            return False
+        except Exception as e:
+            print(f"Error syncing {item}: {str(e)}")
+            return False
+
+    def move_file(self, old_source_path, new_source_path):
+        """Mirror a rename, reusing the already-copied target file when it still matches."""
+        old_target = self.target_for(old_source_path)
+        new_target = self.target_for(new_source_path)
+        if new_target is None or is_ignored(new_source_path):
+            # Moved out of the watched folder (or to an ignored name)
+            self.delete_file(old_source_path)
+            return
+        if old_target and not is_ignored(old_source_path) and files_match(new_source_path, old_target):
+            try:
+                os.replace(old_target, new_target)
+                print(f"Renamed: {os.path.basename(old_source_path)} -> {os.path.basename(new_source_path)}")
+                return
+            except OSError as e:
+                print(f"Error renaming {os.path.basename(old_source_path)}: {str(e)}")
+        self.sync_file(new_source_path)
+        if old_target:
+            self.delete_file(old_source_path)
+
+    def delete_file(self, source_path):
+        """Remove the target copy of a file deleted from the source."""
+        target_path = self.target_for(source_path)
+        if target_path is None or is_ignored(source_path):
+            return
+        try:
+            os.remove(target_path)
+            print(f"Removed: {os.path.basename(source_path)}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error removing {os.path.basename(source_path)}: {str(e)}")
 
     def sync_files(self):
         for item in os.listdir(self.source_dir):
-            source_path = os.path.join(self.source_dir, item)
-            target_path = os.path.join(self.target_dir, item)
-            
-            if os.path.isfile(source_path):
-                try:
-                    shutil.copy2(source_path, target_path)
-                    print(f"Synced: {item}")
-                except Exception as e:
-                    print(f"Error syncing {item}: {str(e)}")
-
-def setup_sync(source_dir, target_dir):
-    if not os.path.exists(source_dir):
-        os.makedirs(source_dir)
-    if not os.path.exists(target_dir):
-        os.makedirs(target_dir)
-    
-    event_handler = SyncHandler(source_dir, target_dir)
-    observer = Observer()
-    observer.schedule(event_handler, source_dir, recursive=False)
-    observer.start()
-    
-    print(f"Syncing {source_dir} to {target_dir}...")
-    
-    try:
-        while True:
-            time.sleep(1)
-    except KeyboardInterrupt:
-        observer.stop()
-    observer.join()
+            self.sync_file(os.path.join(self.source_dir, item))
+
+class CanvasPublishHandler(SyncHandler):
+    """Publishes changed PDFs in one folder to Canvas instead of copying them.
+
+    canvas is a long-lived CanvasIntegrator (see canvas_integration.py --watch),
+    so each debounced change costs only the upload of that one file.
+    """
+
+    def __init__(self, source_dir, canvas, queue=None):
+        super().__init__(source_dir, None, queue=queue)
+        self.canvas = canvas
+
+    def sync_file(self, source_path):
+        if is_ignored(source_path) or not source_path.lower().endswith('.pdf') or not os.path.isfile(source_path):
+            return False
+        try:
+            return self.canvas.publish_file(os.path.relpath(source_path)) is not None
+        except Exception as e:
+            print(f"Error publishing {os.path.basename(source_path)}: {str(e)}")
+            return False
+
+    def move_file(self, old_source_path, new_source_path):
+        return self.sync_file(new_source_path)
+
+    def delete_file(self, source_path):
+        # Removing course material from Canvas stays a manual decision
+        if source_path.lower().endswith('.pdf') and not is_ignored(source_path):
+            print(f"{os.path.basename(source_path)} was deleted locally; leaving it in Canvas.")
+
+class SyncDaemon:
+    """Keeps any number of source -> target folder pairs in sync from one process.
+
+    All pairs are scheduled on a single watchdog observer and share one
+    ChangeQueue, so the thread count stays fixed however many folders are watched.
+    Extra handlers with a source_dir (e.g. CanvasPublishHandler) can be passed as
+    watchers and are scheduled on the same observer and queue.
+    """
+
+    def __init__(self, pairs, quiet_window=1.0, workers=2, reconcile=True, check_hash=False, watchers=()):
+        self.pairs = [(source_dir, target_dir) for source_dir, target_dir in pairs]
+        self.reconcile_on_start = reconcile
+        self.check_hash = check_hash
+        self.queue = ChangeQueue(quiet_window=quiet_window, workers=workers)
+        self.observer = Observer()
+        self.handlers = []
+        self.watchers = list(watchers)
+        self._stop = threading.Event()
+
+    def start(self):
+        for source_dir, target_dir in self.pairs:
+            os.makedirs(source_dir, exist_ok=True)
+            os.makedirs(target_dir, exist_ok=True)
+            handler = SyncHandler(source_dir, target_dir, queue=self.queue)
+            self.observer.schedule(handler, source_dir, recursive=False)
+            self.handlers.append(handler)
+            print(f"Syncing {source_dir} to {target_dir}...")
+        for watcher in self.watchers:
+            watcher.queue = self.queue
+            self.observer.schedule(watcher, watcher.source_dir, recursive=False)
+            print(f"Watching {watcher.source_dir}...")
+        # Watch first so nothing changed during the startup scan is missed
+        self.observer.start()
+        if self.reconcile_on_start and self.pairs:
+            self.reconcile()
+
+    def reconcile(self):
+        """Copy whatever changed while the watcher wasn't running, then report it."""
+        print("Reconciling folders before watching for changes...")
+        reports = [reconcile_dirs(source_dir, target_dir, self.queue.pool, self.check_hash)
+                   for source_dir, target_dir in self.pairs]
+        for report in reports:
+            extra = f", {len(report['extra_in_target'])} only in target" if report['extra_in_target'] else ""
+            print(f"Reconciled {report['source_dir']}: {report['copied']} copied, {report['unchanged']} unchanged, "
+                  f"{report['errors']} errors{extra} in {report['seconds']}s")
+        return reports
+
+    def stop(self, *args):
+        """Ask run() to shut down; usable directly as a signal handler."""
+        self._stop.set()
+
+    def shutdown(self):
+        """Stop watching, apply anything still pending and print the counters."""
+        self.observer.stop()
+        self.observer.join()
+        self.queue.close()
+        print(f"Sync stats: {self.queue.stats()}")
+
+    def run(self):
+        """Start, block until SIGINT/SIGTERM (or stop()), then shut down cleanly."""
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        self.start()
+        try:
+            while not self._stop.wait(1):
+                pass
+        finally:
+            print("Stopping lecture materials synchronization...")
+            self.shutdown()
+
+def setup_sync(source_dir, target_dir, quiet_window=1.0, workers=2):
+    SyncDaemon([(source_dir, target_dir)], quiet_window=quiet_window, workers=workers).run()
+
+def load_pairs(config_path):
+    """Read source/target pairs from a JSON config: {"pairs": [{"source": ..., "target": ...}]}."""
+    with open(config_path) as f:
+        config = json.load(f)
+    return [(os.path.expanduser(pair['source']), os.path.expanduser(pair['target'])) for pair in config['pairs']]
 
 if __name__ == "__main__":
-    # Lecture Notes
-    lecture_notes_source = "/Users/mattlang/Cursor/macroeconomics-course-website/lecture_notes"
-    lecture_notes_target = "/Users/mattlang/Dropbox/Matt/2025/Spring/ECON2/Lecture Notes"
-    
-    # Lecture Slides
-    lecture_slides_source = "/Users/mattlang/Cursor/macroeconomics-course-website/lecture_slides"
-    lecture_slides_target = "/Users/mattlang/Dropbox/Matt/2025/Spring/ECON2/Lecture Slides"
-    
-    # Start sync for both directories
+    parser = argparse.ArgumentParser(description="Keep lecture material folders in sync with Dropbox.")
+    parser.add_argument('--config', help='JSON file listing {"pairs": [{"source": ..., "target": ...}]}')
+    parser.add_argument('--quiet-window', type=float, default=1.0,
+                        help="seconds a file must be left alone before it is copied (default: 1.0)")
+    parser.add_argument('--workers', type=int, default=2, help="copy worker threads (default: 2)")
+    parser.add_argument('--no-reconcile', action='store_true',
+                        help="skip the startup scan for files changed while the watcher was stopped")
+    parser.add_argument('--hash', action='store_true',
+                        help="during the startup scan, hash same-size files whose mtimes differ before copying")
+    args = parser.parse_args()
+
+    if args.config:
+        pairs = load_pairs(args.config)
+    else:
+        # Lecture Notes
+        lecture_notes_source = "/Users/mattlang/Cursor/macroeconomics-course-website/lecture_notes"
+        lecture_notes_target = "/Users/mattlang/Dropbox/Matt/2025/Spring/ECON2/Lecture Notes"
+
+        # Lecture Slides
+        lecture_slides_source = "/Users/mattlang/Cursor/macroeconomics-course-website/lecture_slides"
+        lecture_slides_target = "/Users/mattlang/Dropbox/Matt/2025/Spring/ECON2/Lecture Slides"
+
+        pairs = [(lecture_notes_source, lecture_notes_target), (lecture_slides_source, lecture_slides_target)]
+
+    # Start sync for all directories in one process
     print("Starting lecture materials synchronization...")
-    setup_sync(lecture_notes_source, lecture_notes_target)
-    setup_sync(lecture_slides_source, lecture_slides_target)
+    SyncDaemon(pairs, quiet_window=args.quiet_window, workers=args.workers,
+               reconcile=not args.no_reconcile, check_hash=args.hash).run()
@@ -0,0 +1,81 @@
+"""Sync tests against the in-process FakeCanvas stand-in.
+
+    python -m pytest test_canvas_integration.py
+"""
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from benchmark_canvas_sync import generate_tree
+from canvas_integration import CanvasIntegrator, CanvasTransport, SyncManifest
+from fake_canvas import FakeCanvas
+
+
+class DeletedModuleTest(unittest.TestCase):
+    """A module deleted in Canvas between two syncs comes back in a single run."""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        generate_tree(self.root, 20, 256)
+        os.chdir(self.root)
+        self.fake = FakeCanvas()
+        self.manifest_path = self.root / "manifest.json"
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def sync(self):
+        transport = CanvasTransport(session=self.fake.session())
+        canvas = CanvasIntegrator("token", "1", base_url=self.fake.base_url, transport=transport,
+                                  manifest=SyncManifest.load(self.manifest_path, "1"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            plan = canvas.sync_materials()
+        transport.close()
+        return plan
+
+    def item_titles(self):
+        return {module['name']: sorted(item['title'] for item in self.fake.items[module_id])
+                for module_id, module in self.fake.modules.items()}
+
+    def delete_module(self, name):
+        module_id = next(module_id for module_id, module in self.fake.modules.items() if module['name'] == name)
+        del self.fake.modules[module_id]
+        del self.fake.items[module_id]
+
+    def test_unchanged_files_are_restored(self):
+        self.sync()
+        expected = self.item_titles()
+        self.delete_module("Lecture Materials")
+
+        plan = self.sync()
+
+        self.assertEqual(self.item_titles(), expected)
+        self.assertFalse(plan.errors)
+
+    def test_restored_alongside_changed_file(self):
+        self.sync()
+        expected = self.item_titles()
+        self.delete_module("Lecture Materials")
+        (self.root / "lecture_slides" / "Lecture1_updated.pdf").write_bytes(b'%PDF-1.4\nrevised')
+
+        plan = self.sync()
+
+        self.assertEqual(self.item_titles(), expected)
+        self.assertFalse(plan.errors)
+
+    def test_unchanged_course_is_left_alone(self):
+        self.sync()
+        plan = self.sync()
+
+        self.assertFalse(plan.uploads)
+        self.assertFalse(plan.new_items)
+
+
+if __name__ == "__main__":
+    unittest.main()